@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """LRU cache whose entries also expire ttl seconds after they were set."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self.data.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self.data[key]
+            return default
+        self.data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self.data[key] = (value, expires_at)
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self.data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self.data.clear()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+# Data versions. Writers bump the version of what they changed and cache keys
+# include it, so stale entries are never read again and simply age out.
+# Versions bumped by other workers arrive through sync_version.
+versions: dict[str, int] = {}
+# last shared version seen per namespace, see services.version_service
+shared_versions: dict[str, int] = {}
+
+
+def get_version(namespace: str) -> int:
+    return versions.get(namespace, 0)
+
+
+def bump_version(namespace: str) -> int:
+    versions[namespace] = versions.get(namespace, 0) + 1
+    return versions[namespace]
+
+
+def sync_version(namespace: str, shared_version: int, initial: bool = False):
+    """Bumps namespace if its shared version changed since the last call.
+
+    The initial call only records the version. A namespace first seen later
+    was bumped since, its first write must reach this worker too. The local
+    counter only ever grows, so keys of older entries never match again even
+    though the two counters differ.
+    """
+    previous = shared_versions.get(namespace)
+    if previous != shared_version:
+        if previous is not None or not initial:
+            bump_version(namespace)
+        shared_versions[namespace] = shared_version
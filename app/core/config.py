@@ -8,3 +8,102 @@ TG_GROUP_NAME = os.environ.get("TG_GROUP_NAME")
 TG_API_HASH = os.environ.get("TG_API_HASH")
 TG_API_ID = os.environ.get("TG_API_ID")
 SECRET_KEY = os.environ.get("SECRET_KEY")
+
+# Connection pools. The API and the background parser get separate engines so
+# a backfill cannot take all the connections web requests need.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))  # seconds
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))  # seconds, -1 to disable
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+PARSER_DB_POOL_SIZE = int(os.environ.get("PARSER_DB_POOL_SIZE", 4))
+PARSER_DB_MAX_OVERFLOW = int(os.environ.get("PARSER_DB_MAX_OVERFLOW", 2))
+# asyncpg prepared statement cache, set to 0 behind pgbouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", 100))
+DB_COMMAND_TIMEOUT = float(os.environ.get("DB_COMMAND_TIMEOUT", 60))  # seconds
+
+# bcrypt runs on a thread pool, at most PASSWORD_HASH_MAX_PENDING hashes may
+# be queued or running before logins are turned away with 503
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 64))
+
+# Threads rendering the thumb/medium/full variants of uploaded images
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))
+# Stored images are served under /images, their content never changes
+IMAGE_MAX_AGE = int(os.environ.get("IMAGE_MAX_AGE", 30 * 24 * 3600))  # seconds
+
+# Stored images unreferenced for IMAGE_GC_GRACE_MINUTES are deleted by a job
+# running every IMAGE_GC_INTERVAL_MINUTES in the ingestion worker
+IMAGE_GC_INTERVAL_MINUTES = int(os.environ.get("IMAGE_GC_INTERVAL_MINUTES", 60))
+IMAGE_GC_GRACE_MINUTES = int(os.environ.get("IMAGE_GC_GRACE_MINUTES", 60))
+
+# Decoded access tokens are cached per token for AUTH_TOKEN_CACHE_TTL seconds
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", 10_000))
+AUTH_TOKEN_CACHE_TTL = float(os.environ.get("AUTH_TOKEN_CACHE_TTL", 60))
+
+# Run `alembic upgrade head` on application startup
+DB_AUTO_MIGRATE = os.environ.get("DB_AUTO_MIGRATE", "true").lower() == "true"
+# Advisory lock serializing the migrations of workers starting together
+MIGRATION_LOCK_KEY = int(os.environ.get("MIGRATION_LOCK_KEY", 7_340_022))
+
+# Responses of the read endpoints: "memory" caches them per worker, "redis"
+# in the store at REDIS_URL shared by all workers, "none" disables the cache
+RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "memory").lower()
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 2048))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 300))  # seconds
+# How often every worker picks up the data versions bumped by the ingestion
+# worker, which bounds how stale cached counts and responses can be
+DATA_VERSION_POLL_INTERVAL = float(os.environ.get("DATA_VERSION_POLL_INTERVAL", 1))
+
+# Category hierarchy kept in memory by services.category_service
+CATEGORY_TREE_TTL = float(os.environ.get("CATEGORY_TREE_TTL", 300))  # seconds
+
+# tg_posts listing counts
+TG_POSTS_COUNT_CAP = int(os.environ.get("TG_POSTS_COUNT_CAP", 1000))
+TG_POSTS_COUNT_CACHE_TTL = float(os.environ.get("TG_POSTS_COUNT_CACHE_TTL", 300))
+
+# Parser
+# Comma separated channels to ingest concurrently, defaults to TG_GROUP_NAME
+TG_CHANNELS = [
+    channel.strip()
+    for channel in os.environ.get("TG_CHANNELS", TG_GROUP_NAME or "").split(",")
+    if channel.strip()
+]
+TG_HISTORY_PAGE_SIZE = int(os.environ.get("TG_HISTORY_PAGE_SIZE", 100))
+TG_MIN_REQUEST_INTERVAL = float(os.environ.get("TG_MIN_REQUEST_INTERVAL", 0.07))
+PARSER_WRITE_QUEUE_SIZE = int(os.environ.get("PARSER_WRITE_QUEUE_SIZE", 2000))
+PARSER_FLUSH_INTERVAL = float(os.environ.get("PARSER_FLUSH_INTERVAL", 2))  # seconds
+# Ingestion runs in the background in one worker only, the one holding the
+# INGEST_LOCK_KEY advisory lock; the others retry every INGEST_LOCK_RETRY seconds
+INGEST_ENABLED = os.environ.get("INGEST_ENABLED", "true").lower() == "true"
+INGEST_LOCK_KEY = int(os.environ.get("INGEST_LOCK_KEY", 7_340_021))
+INGEST_LOCK_RETRY = float(os.environ.get("INGEST_LOCK_RETRY", 60))
+
+# Streaming ingestion of new posts through Telegram updates, the daily
+# update_db run then only reconciles what the stream missed
+TG_STREAMING_ENABLED = os.environ.get("TG_STREAMING_ENABLED", "true").lower() == "true"
+MEDIA_GROUP_WAIT = float(os.environ.get("MEDIA_GROUP_WAIT", 1.5))  # seconds
+# Longest wait before a failed stream is restarted
+STREAM_MAX_BACKOFF = float(os.environ.get("STREAM_MAX_BACKOFF", 300))  # seconds
+PARSER_BATCH_SIZE = int(os.environ.get("PARSER_BATCH_SIZE", 500))
+# Parse results cached by caption hash, reposted listings skip parsing and
+# only move the stored post's publication date. The cache is warmed from the
+# PARSE_CACHE_WARM_ROWS most recent tg_posts rows, 0 starts it empty.
+PARSE_CACHE_SIZE = int(os.environ.get("PARSE_CACHE_SIZE", 50_000))
+PARSE_CACHE_WARM_ROWS = int(os.environ.get("PARSE_CACHE_WARM_ROWS", 20_000))
+DAYS_TO_PARSE = int(os.environ.get("DAYS_TO_PARSE", 6 * 90))  # 6 months
+
+# Photos of tg_posts are downloaded by the parser, at most
+# TG_IMAGE_DOWNLOADS at a time, and served from disk. Past TG_IMAGES_QUOTA_MB
+# the least recently posted photos are evicted; photos of expired posts are
+# evicted by the retention job in any case.
+TG_IMAGE_MIRROR_ENABLED = os.environ.get("TG_IMAGE_MIRROR_ENABLED", "true").lower() == "true"
+TG_IMAGE_DOWNLOADS = int(os.environ.get("TG_IMAGE_DOWNLOADS", 4))
+TG_IMAGE_MAX_FAILURES = int(os.environ.get("TG_IMAGE_MAX_FAILURES", 3))
+TG_IMAGES_QUOTA_MB = int(os.environ.get("TG_IMAGES_QUOTA_MB", 2048))
+TG_IMAGE_MAX_AGE = int(os.environ.get("TG_IMAGE_MAX_AGE", 30 * 24 * 3600))  # seconds
+
+# Retention of tg_posts, posts older than DAYS_TO_PARSE are deleted
+RETENTION_BATCH_SIZE = int(os.environ.get("RETENTION_BATCH_SIZE", 5000))
+RETENTION_INTERVAL_MINUTES = int(os.environ.get("RETENTION_INTERVAL_MINUTES", 60))
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+
+from core import metrics
+from core.config import IMAGE_WORKERS
+
+# Responsive variants of uploaded images, name -> longest side in pixels
+VARIANTS = {"thumb": 320, "medium": 1024, "full": 2048}
+VARIANT_FORMAT = "webp"
+VARIANT_QUALITY = 80
+
+# Pillow releases the GIL while decoding, resizing and encoding, so threads
+# render variants in parallel without blocking the event loop
+image_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="images")
+
+
+def variant_path(path: str, name: str) -> str:
+    return f"{os.path.splitext(path)[0]}_{name}.{VARIANT_FORMAT}"
+
+
+def image_url(path: str) -> str:
+    """URL of a stored image or variant, served by routes.image_route."""
+    return f"/images/{os.path.basename(path)}"
+
+
+def tg_image_url(file_id: str, variant: str | None = None) -> str:
+    """URL of a mirrored tg_posts photo, the original unless variant is given."""
+    return f"/tg_posts/images/{file_id}" + (f"?variant={variant}" if variant else "")
+
+
+def render_variants(path: str) -> dict[str, str]:
+    """Writes every variant of the image next to it, never upscaling.
+
+    Stored images are shared, variants already rendered are reused. If
+    rendering fails, the variants written so far are removed.
+    """
+    variants = {name: variant_path(path, name) for name in VARIANTS}
+    if all(os.path.exists(variant) for variant in variants.values()):
+        return variants
+    written = {}
+    try:
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            for name, size in VARIANTS.items():
+                variant = image.copy()
+                variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+                written[name] = variants[name]
+                variant.save(variants[name], VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4)
+    except Exception:
+        remove_variants(written)
+        raise
+    return variants
+
+
+async def make_variants(path: str) -> dict[str, str] | None:
+    """Renders the variants of an image on the image pool, None if it is
+    unreadable or too large to decode."""
+    started_at = time.perf_counter()
+    try:
+        variants = await asyncio.get_running_loop().run_in_executor(
+            image_executor, render_variants, path
+        )
+    except (OSError, ValueError, Image.DecompressionBombError):
+        metrics.increment("images.variant_errors")
+        return None
+    metrics.observe("images.variants_time", time.perf_counter() - started_at)
+    return variants
+
+
+def remove_variants(variants: dict[str, str] | None):
+    for path in (variants or {}).values():
+        if os.path.exists(path):
+            os.remove(path)
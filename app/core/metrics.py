@@ -0,0 +1,65 @@
+from collections import deque
+
+# In-process metrics registry, exposed by the /metrics route.
+
+
+class LatencyStats:
+    """Count, sum and max of observed durations plus a window of recent samples."""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def snapshot(self) -> dict[str, float]:
+        ordered = sorted(self.samples)
+
+        def pct(value: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(value * len(ordered)))] * 1000
+
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "max_ms": self.max * 1000,
+        }
+
+
+counters: dict[str, float] = {}
+gauges: dict[str, float] = {}
+latencies: dict[str, LatencyStats] = {}
+
+
+def increment(name: str, value: float = 1):
+    counters[name] = counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: float):
+    gauges[name] = value
+
+
+def observe(name: str, seconds: float):
+    if name not in latencies:
+        latencies[name] = LatencyStats()
+    latencies[name].observe(seconds)
+
+
+def snapshot(prefix: str = "") -> dict[str, dict]:
+    """Returns all metrics whose name starts with prefix."""
+    return {
+        "counters": {k: v for k, v in counters.items() if k.startswith(prefix)},
+        "gauges": {k: v for k, v in gauges.items() if k.startswith(prefix)},
+        "latencies": {
+            k: v.snapshot() for k, v in latencies.items() if k.startswith(prefix)
+        },
+    }
@@ -0,0 +1,38 @@
+import asyncio
+
+from core import metrics
+
+
+class AdaptiveRateLimiter:
+    """Paces calls shared by several tasks and backs off on Telegram FloodWait.
+
+    Calls are spaced at least `interval` seconds apart. A FloodWait blocks every
+    caller for the requested time and doubles the interval, successful calls
+    slowly bring it back down to min_interval.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float = 5.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            now = loop.time()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def on_success(self):
+        self.interval = max(self.min_interval, self.interval * 0.9)
+
+    def on_flood_wait(self, seconds: float):
+        now = asyncio.get_running_loop().time()
+        self.next_slot = max(self.next_slot, now + seconds)
+        self.interval = min(self.max_interval, self.interval * 2)
+        metrics.increment("ingest.flood_waits")
+        metrics.increment("ingest.flood_wait_seconds", seconds)
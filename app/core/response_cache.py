@@ -0,0 +1,188 @@
+import functools
+import hashlib
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from core import metrics
+from core.cache import TTLCache, bump_version, get_version
+from core.config import (
+    REDIS_URL,
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+)
+from core.logger import televito_logger
+
+# Rendered JSON bodies of read endpoints, keyed with the data version of their
+# namespace. Writers call response_cache.bump, stale entries are never read
+# again and age out. Entries are stored as b"<etag>\n<body>".
+
+
+class MemoryBackend:
+    """Per process LRU. Bumps of other workers arrive with the data versions
+    polled from the database, see services.version_service."""
+
+    def __init__(self, maxsize: int):
+        self.entries = TTLCache(maxsize=maxsize)
+
+    async def get(self, key: str) -> bytes | None:
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self.entries.set(key, value, ttl=ttl)
+
+    async def get_version(self, namespace: str) -> int:
+        return get_version(namespace)
+
+    async def bump_version(self, namespace: str):
+        pass  # core.cache holds the versions of this process
+
+
+class RedisBackend:
+    """Redis-compatible store shared by every worker, versions included."""
+
+    def __init__(self, url: str, prefix: str = "televito:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError(
+                "RESPONSE_CACHE_BACKEND=redis needs the redis package: pip install redis"
+            )
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self.client.set(self.prefix + key, value, px=int(ttl * 1000))
+
+    async def get_version(self, namespace: str) -> int:
+        return int(await self.client.get(f"{self.prefix}version:{namespace}") or 0)
+
+    async def bump_version(self, namespace: str):
+        await self.client.incr(f"{self.prefix}version:{namespace}")
+
+
+class ResponseCache:
+    def __init__(self, backend: MemoryBackend | RedisBackend | None, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def bump(self, namespace: str):
+        """Invalidates the cached responses of namespace, in every worker with Redis."""
+        bump_version(namespace)
+        if self.backend:
+            try:
+                await self.backend.bump_version(namespace)
+            except Exception as e:
+                metrics.increment("response_cache.errors")
+                televito_logger.error(f"RESPONSE CACHE BUMP OF {namespace} FAILED: {e!r}")
+
+    @staticmethod
+    def key(request: Request, namespace: str, version: int, vary: str = "") -> str:
+        """Query params sorted and blank ones dropped, so equivalent URLs share entries.
+
+        The host is part of the key since responses hold absolute links.
+        """
+        params = sorted(
+            (name, value) for name, value in request.query_params.multi_items() if value
+        )
+        query = "&".join(f"{name}={value}" for name, value in params)
+        return (
+            f"{namespace}:{version}:{vary}:{request.url.scheme}://"
+            f"{request.url.netloc}{request.url.path}?{query}"
+        )
+
+    async def lookup(
+        self, request: Request, namespace: str, vary: str
+    ) -> tuple[str | None, bytes | None]:
+        """(key, stored entry); no key when the backend is unavailable."""
+        try:
+            version = await self.backend.get_version(namespace)
+            key = self.key(request, namespace, version, vary)
+            return key, await self.backend.get(key)
+        except Exception as e:
+            metrics.increment("response_cache.errors")
+            televito_logger.warning(f"RESPONSE CACHE UNAVAILABLE: {e!r}")
+            return None, None
+
+    async def respond(
+        self,
+        request: Request,
+        namespace: str,
+        build: Callable[[], Awaitable],
+        ttl: float | None = None,
+        vary: str = "",
+    ) -> Response:
+        """The JSON response of build, from the cache when possible, 304 if the
+        client's If-None-Match still matches."""
+        if not self.backend:
+            return JSONResponse(jsonable_encoder(await build()))
+
+        key, entry = await self.lookup(request, namespace, vary)
+        if entry is None:
+            metrics.increment("response_cache.misses")
+            body = JSONResponse(jsonable_encoder(await build())).body
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if key:
+                try:
+                    await self.backend.set(key, etag.encode() + b"\n" + body, ttl or self.ttl)
+                except Exception as e:
+                    metrics.increment("response_cache.errors")
+                    televito_logger.warning(f"RESPONSE CACHE UNAVAILABLE: {e!r}")
+            status = "MISS"
+        else:
+            metrics.increment("response_cache.hits")
+            etag, body = entry.split(b"\n", 1)
+            etag = etag.decode()
+            status = "HIT"
+
+        # clients revalidate every time, an unchanged response costs no body
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Cache": status}
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            metrics.increment("response_cache.not_modified")
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+
+def create_backend() -> MemoryBackend | RedisBackend | None:
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend(REDIS_URL)
+    if RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryBackend(RESPONSE_CACHE_SIZE)
+    return None  # "none" disables the cache
+
+
+response_cache = ResponseCache(create_backend(), ttl=RESPONSE_CACHE_TTL)
+
+
+def cached(
+    namespace: str,
+    ttl: float | None = None,
+    vary: Callable[[Request], str] | None = None,
+):
+    """Caches the JSON response of a GET endpoint taking a request: Request param.
+
+    vary adds what the response depends on besides the URL to the key.
+    """
+
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request = kwargs["request"]
+            return await response_cache.respond(
+                request,
+                namespace,
+                lambda: endpoint(*args, **kwargs),
+                ttl=ttl,
+                vary=vary(request) if vary else "",
+            )
+
+        return wrapper
+
+    return decorator
@@ -1,37 +1,109 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
-from .config import SECRET_KEY
+from . import metrics
+from .cache import TTLCache
+from .config import (
+    AUTH_TOKEN_CACHE_SIZE,
+    AUTH_TOKEN_CACHE_TTL,
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_WORKERS,
+    SECRET_KEY,
+)
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/token/", auto_error=False)
 
+# A bcrypt round takes ~100-300 ms of CPU and would block the event loop. The
+# bcrypt C extension releases the GIL, so a thread pool hashes in parallel.
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password"
+)
+password_jobs = {"pending": 0}
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
 
+def timed_call(func, *args):
+    return time.perf_counter(), func(*args)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
 
+async def run_password_job(name: str, func, *args):
+    """Runs a passlib call on the password pool, recording queue and run times."""
+    if password_jobs["pending"] >= PASSWORD_HASH_MAX_PENDING:
+        metrics.increment("auth.password_jobs_rejected")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later",
+        )
+
+    password_jobs["pending"] += 1
+    metrics.set_gauge("auth.password_jobs_pending", password_jobs["pending"])
+    submitted_at = time.perf_counter()
+    try:
+        started_at, result = await asyncio.get_running_loop().run_in_executor(
+            password_executor, timed_call, func, *args
+        )
+    finally:
+        password_jobs["pending"] -= 1
+        metrics.set_gauge("auth.password_jobs_pending", password_jobs["pending"])
+    metrics.observe("auth.password_queue_time", started_at - submitted_at)
+    metrics.observe(f"auth.{name}_time", time.perf_counter() - started_at)
+    return result
+
+
+async def hash_password(password: str) -> str:
+    return await run_password_job("hash_password", pwd_context.hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await run_password_job(
+        "verify_password", pwd_context.verify, plain_password, hashed_password
+    )
 
-def create_access_token(username: str, expire_minutes: datetime = 30) -> str:
+
+def create_access_token(
+    username: str, user_id: int | None = None, expire_minutes: datetime = 30
+) -> str:
     to_encode = {"sub": username}
+    if user_id is not None:
+        to_encode["uid"] = user_id
     expire = datetime.now() + timedelta(minutes=expire_minutes)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
 
 
-def verify_access_token(token: str) -> str:
+# token -> decoded payload, entries never outlive the token's exp
+token_cache = TTLCache(maxsize=AUTH_TOKEN_CACHE_SIZE, ttl=AUTH_TOKEN_CACHE_TTL)
+
+
+def decode_access_token(token: str) -> dict:
+    """Returns the verified payload of a token, {"sub": username, "uid": id, ...}."""
+    payload = token_cache.get(token)
+    if payload is not None:
+        metrics.increment("auth.token_cache.hits")
+        return payload
+    metrics.increment("auth.token_cache.misses")
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        return payload["sub"]
     except (JWTError, AttributeError):
+        payload = None
+    if not payload or "sub" not in payload:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+    ttl = min(AUTH_TOKEN_CACHE_TTL, payload.get("exp", float("inf")) - time.time())
+    if ttl > 0:
+        token_cache.set(token, payload, ttl=ttl)
+    return payload
+
+
+def verify_access_token(token: str) -> str:
+    return decode_access_token(token)["sub"]
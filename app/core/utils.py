@@ -1,19 +1,66 @@
+import asyncio
+import hashlib
 import os
-import shutil
-from uuid import uuid4
+import time
 from fastapi import HTTPException, UploadFile, status
 
+from core import metrics
+from core.logger import televito_logger
 
-def save_image(image: UploadFile, dir: str) -> str:
+CHUNK_SIZE = 256 * 1024  # bytes
+
+
+def image_extension(image: UploadFile) -> str:
     file_extension = image.filename.split(".")[-1]
     if file_extension not in ["jpg", "jpeg", "png"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image format"
         )
-    file_name = f"{uuid4()}.{file_extension}"
-    file_path = os.path.join(dir, file_name)
+    return file_extension
+
+
+def write_chunk(buffer, digest, chunk: bytes):
+    buffer.write(chunk)
+    digest.update(chunk)
+
+
+async def stream_upload(
+    image: UploadFile, file_path: str, max_size: int | None = None
+) -> tuple[str, int]:
+    """Streams an upload to file_path in chunks, file writes run off the event loop.
+
+    Returns the sha256 hex digest and the size of the content. Raises 413 as
+    soon as more than max_size bytes were read, the partial file is removed.
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"{image.filename} is too large",
+    )
+    if max_size is not None and image.size is not None and image.size > max_size:
+        raise too_large
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
+    started_at = time.perf_counter()
+    written = 0
+    digest = hashlib.sha256()
+    buffer = await asyncio.to_thread(open, file_path, "wb")
+    try:
+        while chunk := await image.read(CHUNK_SIZE):
+            written += len(chunk)
+            if max_size is not None and written > max_size:
+                raise too_large
+            await asyncio.to_thread(write_chunk, buffer, digest, chunk)
+    except BaseException:
+        await asyncio.to_thread(buffer.close)
+        await asyncio.to_thread(os.remove, file_path)
+        raise
+    await asyncio.to_thread(buffer.close)
 
-    return file_path
+    elapsed = time.perf_counter() - started_at
+    metrics.increment("uploads.files")
+    metrics.increment("uploads.bytes", written)
+    metrics.observe("uploads.save_time", elapsed)
+    metrics.set_gauge("uploads.last_mb_per_second", written / 2**20 / max(elapsed, 1e-9))
+    televito_logger.debug(
+        f"SAVED {file_path}: {written} BYTES IN {elapsed * 1000:.1f} MS"
+    )
+    return digest.hexdigest(), written
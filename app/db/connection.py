@@ -1,19 +1,175 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
 
-from core.config import DB_URL
-from . import Base
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from core import metrics
+from core.config import (
+    DB_COMMAND_TIMEOUT,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_URL,
+    MIGRATION_LOCK_KEY,
+    PARSER_DB_MAX_OVERFLOW,
+    PARSER_DB_POOL_SIZE,
+)
+from core.logger import televito_logger
 
-engine = create_async_engine(DB_URL)
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    metrics_name = "db.pool"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe(f"{self.metrics_name}.checkout_wait", time.perf_counter() - start)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+def make_engine(name: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+    new_engine = create_async_engine(
+        DB_URL,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": DB_COMMAND_TIMEOUT,
+            "server_settings": {"application_name": f"televito-{name}"},
+        },
+    )
+    new_engine.pool.metrics_name = f"db.pool.{name}"
+    return new_engine
+
+
+engine = make_engine("api", DB_POOL_SIZE, DB_MAX_OVERFLOW)
 SessionLocal = async_sessionmaker(engine)
 
+parser_engine = make_engine("parser", PARSER_DB_POOL_SIZE, PARSER_DB_MAX_OVERFLOW)
+ParserSessionLocal = async_sessionmaker(parser_engine)
 
-async def get_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ALEMBIC_INI = os.path.join(ROOT_DIR, "alembic.ini")
+MIGRATIONS_DIR = os.path.join(ROOT_DIR, "app", "db", "migrations")
 
-    async with SessionLocal() as db:
+
+def pool_stats() -> dict[str, dict[str, int]]:
+    """Current occupancy of the API and parser connection pools."""
+    return {
+        name: {
+            "size": e.pool.size(),
+            "checked_in": e.pool.checkedin(),
+            "checked_out": e.pool.checkedout(),
+            "overflow": e.pool.overflow(),
+        }
+        for name, e in (("api", engine), ("parser", parser_engine))
+    }
+
+
+# Schema of the first migration, which databases created before Alembic
+# (Base.metadata.create_all) already have without an alembic_version row
+BASELINE_REVISION = "3f8040a1124e"
+
+
+def alembic_config() -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    # keep the app logging setup instead of the one from alembic.ini
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade_schema(revision: str = "head"):
+    """Applies pending Alembic migrations (blocking, uses the sync driver)."""
+    command.upgrade(alembic_config(), revision)
+
+
+def stamp_schema(revision: str):
+    """Records revision as applied without running it (blocking)."""
+    command.stamp(alembic_config(), revision)
+
+
+async def is_unversioned_schema() -> bool:
+    """Whether the tables exist but Alembic never ran on this database."""
+    async with parser_engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT to_regclass('alembic_version') IS NULL"
+                " AND to_regclass('users') IS NOT NULL"
+            )
+        )
+        return result.scalar()
+
+
+async def init_db():
+    """Brings the database schema up to date once, on application startup.
+
+    Workers starting together take turns on MIGRATION_LOCK_KEY, the first one
+    migrates and the others find nothing left to do. A database created with
+    create_all is stamped at the baseline revision first.
+    """
+    async with advisory_lock(MIGRATION_LOCK_KEY, wait=True):
+        if await is_unversioned_schema():
+            televito_logger.warning(
+                f"DATABASE HAS NO ALEMBIC VERSION, STAMPING {BASELINE_REVISION}"
+            )
+            await asyncio.to_thread(stamp_schema, BASELINE_REVISION)
+        await asyncio.to_thread(upgrade_schema)
+    televito_logger.info("DATABASE SCHEMA IS UP-TO-DATE")
+
+
+@asynccontextmanager
+async def advisory_lock(key: int, wait: bool = False, poll_interval: float = 1):
+    """Takes a session-level advisory lock, yields whether it was taken.
+
+    Without wait it gives up at once if another session holds the lock. The
+    lock lives on a dedicated parser connection and is held until the block
+    exits, or until that connection dies.
+
+    With wait it retries every poll_interval seconds, committing in between:
+    a session blocked in pg_advisory_lock would keep a snapshot open, which
+    CREATE INDEX CONCURRENTLY in the lock holder's migration waits for, and
+    would hit DB_COMMAND_TIMEOUT during long migrations.
+    """
+    async with parser_engine.connect() as conn:
+        while True:
+            result = await conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": key}
+            )
+            acquired = result.scalar()
+            await conn.commit()
+            if acquired or not wait:
+                break
+            await asyncio.sleep(poll_interval)
         try:
-            yield db
+            yield acquired
         finally:
-            await db.close()
+            if acquired:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                await conn.commit()
+
+
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
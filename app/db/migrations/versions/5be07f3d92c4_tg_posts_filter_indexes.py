@@ -0,0 +1,57 @@
+"""tg_posts filter indexes
+
+Revision ID: 5be07f3d92c4
+Revises: a41c9e2b7d10
+Create Date: 2026-10-18 14:02:15.204118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5be07f3d92c4'
+down_revision: Union[str, None] = 'a41c9e2b7d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_tg_posts_publication_datetime', ['publication_datetime', 'id'], None),
+    ('ix_tg_posts_status', ['status', 'id'], None),
+    ('ix_tg_posts_duration', ['duration', 'id'], None),
+    ('ix_tg_posts_rooms', ['rooms', 'id'], None),
+    ('ix_tg_posts_area', ['area', 'id'], None),
+    ('ix_tg_posts_floor', ['floor', 'id'], None),
+    ('ix_tg_posts_price', ['price', 'publication_datetime'], None),
+    ('ix_tg_posts_new_publication_datetime', ['publication_datetime', 'id'], 'is_new'),
+    ('ix_tg_posts_pets_publication_datetime', ['publication_datetime', 'id'], 'pets_allowed'),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps tg_posts writable while the indexes build
+    with op.get_context().autocommit_block():
+        for name, columns, where in INDEXES:
+            op.create_index(
+                name,
+                'tg_posts',
+                columns,
+                unique=False,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+    op.execute('ANALYZE tg_posts')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name='tg_posts',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
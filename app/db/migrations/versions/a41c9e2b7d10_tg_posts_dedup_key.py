@@ -0,0 +1,44 @@
+"""tg_posts dedup key
+
+Revision ID: a41c9e2b7d10
+Revises: 3f8040a1124e
+Create Date: 2026-10-18 13:20:41.512733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c9e2b7d10'
+down_revision: Union[str, None] = '3f8040a1124e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # keep only the newest post for every dedup key before enforcing uniqueness
+    op.execute(
+        """
+        DELETE FROM tg_posts AS old
+        USING tg_posts AS new
+        WHERE old.location = new.location
+          AND old.area IS NOT DISTINCT FROM new.area
+          AND old.floor IS NOT DISTINCT FROM new.floor
+          AND old.floors_in_building IS NOT DISTINCT FROM new.floors_in_building
+          AND (old.publication_datetime, old.id) < (new.publication_datetime, new.id)
+        """
+    )
+    op.create_index(
+        'uq_tg_posts_dedup_key',
+        'tg_posts',
+        ['location', 'area', 'floor', 'floors_in_building'],
+        unique=True,
+        postgresql_nulls_not_distinct=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_tg_posts_dedup_key', table_name='tg_posts')
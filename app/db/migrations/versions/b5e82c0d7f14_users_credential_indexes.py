@@ -0,0 +1,62 @@
+"""users credential indexes
+
+Revision ID: b5e82c0d7f14
+Revises: 8c61f2d4a9b3
+Create Date: 2026-10-18 18:22:47.930164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e82c0d7f14'
+down_revision: Union[str, None] = '8c61f2d4a9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DUPLICATES = {
+    'username': 'SELECT lower(username) FROM users GROUP BY 1 HAVING count(*) > 1',
+    'email': 'SELECT lower(email) FROM users GROUP BY 1 HAVING count(*) > 1',
+    'phone': (
+        "SELECT regexp_replace(phone, '\\D', '', 'g') FROM users "
+        "WHERE phone IS NOT NULL GROUP BY 1 HAVING count(*) > 1"
+    ),
+}
+
+
+def upgrade() -> None:
+    # accounts cannot be merged automatically, they have to be fixed by hand
+    conn = op.get_bind()
+    for column, query in DUPLICATES.items():
+        duplicates = [row[0] for row in conn.execute(sa.text(query + ' LIMIT 10'))]
+        if duplicates:
+            raise RuntimeError(
+                f'users.{column} values that only differ in case or formatting: '
+                f'{duplicates}, rename them before upgrading'
+            )
+
+    op.add_column('users', sa.Column('phone_normalized', sa.String(length=20), nullable=True))
+    op.execute(
+        "UPDATE users SET phone_normalized = regexp_replace(phone, '\\D', '', 'g') "
+        "WHERE phone IS NOT NULL"
+    )
+    op.create_index(
+        'uq_users_username_lower', 'users', [sa.text('lower(username)')], unique=True
+    )
+    op.create_index('uq_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+    op.create_index('uq_users_phone_normalized', 'users', ['phone_normalized'], unique=True)
+    # superseded by the case-insensitive and normalized indexes
+    op.drop_constraint('users_email_key', 'users', type_='unique')
+    op.drop_constraint('users_phone_key', 'users', type_='unique')
+
+
+def downgrade() -> None:
+    op.create_unique_constraint('users_phone_key', 'users', ['phone'])
+    op.create_unique_constraint('users_email_key', 'users', ['email'])
+    op.drop_index('uq_users_phone_normalized', table_name='users')
+    op.drop_index('uq_users_email_lower', table_name='users')
+    op.drop_index('uq_users_username_lower', table_name='users')
+    op.drop_column('users', 'phone_normalized')
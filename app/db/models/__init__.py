@@ -2,3 +2,7 @@ from .tg_post_model import TGPostModel
 from .user_model import UserModel
 from .post_model import PostModel
 from .category_model import CategoryModel
+from .ingest_state_model import IngestStateModel
+from .image_blob_model import ImageBlobModel
+from .tg_image_model import TGImageModel
+from .data_version_model import DataVersionModel
@@ -0,0 +1,13 @@
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+from .. import Base
+
+
+class DataVersionModel(Base):
+    """Data version of a cache namespace shared by every worker, see
+    services.version_service."""
+
+    __tablename__ = "data_versions"
+
+    namespace: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+from .. import Base
+
+
+class ImageBlobModel(Base):
+    """An uploaded image stored once by content, see services.image_service."""
+
+    __tablename__ = "image_blobs"
+    __table_args__ = (
+        # the garbage collector looks for unreferenced blobs
+        Index(
+            "ix_image_blobs_unreferenced",
+            "updated_at",
+            postgresql_where=text("refcount <= 0"),
+        ),
+    )
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    path: Mapped[str] = mapped_column(String(200), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # posts and profiles referencing the blob, unreferenced blobs are collected
+    refcount: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from .. import Base
+
+
+class IngestStateModel(Base):
+    """Per-channel ingestion checkpoint of the Telegram parser."""
+
+    __tablename__ = "ingest_state"
+
+    channel: Mapped[str] = mapped_column(String(100), primary_key=True)
+    # newest message id of the last completed run, the next run stops there
+    last_message_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    # set while a run is in progress: its newest message and the oldest one
+    # already written, so an interrupted run resumes below run_offset_message_id
+    run_top_message_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    run_offset_message_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
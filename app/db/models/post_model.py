@@ -11,6 +11,7 @@ from sqlalchemy import (
     Text,
     func,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .. import Base
 
@@ -27,6 +28,8 @@ class PostModel(Base):
     description: Mapped[str] = mapped_column(Text, nullable=True)
     is_new: Mapped[bool] = mapped_column(Boolean, nullable=True)
     images: Mapped[list[str]] = mapped_column(ARRAY(String(100)), nullable=True)
+    # image path -> {"thumb": path, "medium": path, "full": path}, see core.images
+    image_variants: Mapped[dict] = mapped_column(JSONB, nullable=True)
     publication_datetime: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now(), nullable=False
     )
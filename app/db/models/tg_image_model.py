@@ -0,0 +1,30 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+from .. import Base
+
+
+class TGImageModel(Base):
+    """A photo of tg_posts mirrored locally, see services.tg_image_service."""
+
+    __tablename__ = "tg_images"
+    __table_args__ = (
+        # the mirror downloads the most recent pending photos first
+        Index(
+            "ix_tg_images_pending",
+            "last_used_at",
+            postgresql_where=text("sha256 IS NULL"),
+        ),
+        # eviction drops the least recently used photos first
+        Index("ix_tg_images_last_used_at", "last_used_at"),
+        Index("ix_tg_images_sha256", "sha256"),
+    )
+
+    # pyrogram file_id, as stored in tg_posts.images
+    file_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    # content of the downloaded photo, NULL until it is mirrored
+    sha256: Mapped[str] = mapped_column(String(64), nullable=True)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    failures: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # publication date of the newest post showing the photo
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -6,8 +6,11 @@ from sqlalchemy import (
     Date,
     DateTime,
     Float,
+    Index,
     Integer,
     String,
+    Text,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column
 from .. import Base
@@ -15,6 +18,40 @@ from .. import Base
 
 class TGPostModel(Base):
     __tablename__ = "tg_posts"
+    __table_args__ = (
+        # the parser upserts on this key, NULLs must compare equal (PostgreSQL 15+)
+        Index(
+            "uq_tg_posts_dedup_key",
+            "location",
+            "area",
+            "floor",
+            "floors_in_building",
+            unique=True,
+            postgresql_nulls_not_distinct=True,
+        ),
+        # default sort, keyset pagination and the retention range delete
+        Index("ix_tg_posts_publication_datetime", "publication_datetime", "id"),
+        # range filters that are also sort keys, id keeps keyset seeks on the index
+        Index("ix_tg_posts_status", "status", "id"),
+        Index("ix_tg_posts_duration", "duration", "id"),
+        Index("ix_tg_posts_rooms", "rooms", "id"),
+        Index("ix_tg_posts_area", "area", "id"),
+        Index("ix_tg_posts_floor", "floor", "id"),
+        Index("ix_tg_posts_price", "price", "publication_datetime"),
+        # boolean filters only select a minority of the rows
+        Index(
+            "ix_tg_posts_new_publication_datetime",
+            "publication_datetime",
+            "id",
+            postgresql_where=text("is_new"),
+        ),
+        Index(
+            "ix_tg_posts_pets_publication_datetime",
+            "publication_datetime",
+            "id",
+            postgresql_where=text("pets_allowed"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(
         BigInteger, primary_key=True, index=True, autoincrement=True
@@ -38,3 +75,6 @@ class TGPostModel(Base):
     parking: Mapped[str] = mapped_column(String(100), nullable=True)
     images: Mapped[list[str]] = mapped_column(ARRAY(String(100)), nullable=True)
     publication_datetime: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    caption: Mapped[str] = mapped_column(Text, nullable=True)  # raw Telegram caption
+    # sha256 of the normalized caption, see parser_re.caption_hash
+    caption_hash: Mapped[str] = mapped_column(String(64), nullable=True)
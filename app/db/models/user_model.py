@@ -1,10 +1,16 @@
 from datetime import datetime
 import re
-from sqlalchemy import BigInteger, DateTime, Float, String, func
+from sqlalchemy import BigInteger, DateTime, Float, Index, String, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from .. import Base
 
 
+def normalize_phone(phone: str) -> str:
+    """Digits only, "+381641234567" and "381641234567" are the same phone."""
+    return re.sub(r"\D", "", phone)
+
+
 class UserModel(Base):
     __tablename__ = "users"
 
@@ -12,10 +18,14 @@ class UserModel(Base):
         BigInteger, primary_key=True, index=True, autoincrement=True
     )
     username: Mapped[str] = mapped_column(String(100), nullable=False)
-    email: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
-    phone: Mapped[str] = mapped_column(String(20), unique=True, nullable=True)
+    email: Mapped[str] = mapped_column(String(100), nullable=False)
+    phone: Mapped[str] = mapped_column(String(20), nullable=True)
+    # set with phone, credentials are looked up by it
+    phone_normalized: Mapped[str] = mapped_column(String(20), nullable=True)
     password: Mapped[str] = mapped_column(String(100), nullable=False)
     profile_photo: Mapped[str] = mapped_column(String(100), nullable=True)
+    # {"thumb": path, "medium": path, "full": path}, see core.images
+    profile_photo_variants: Mapped[dict] = mapped_column(JSONB, nullable=True)
     description: Mapped[str] = mapped_column(String(300), nullable=True)
     rating: Mapped[float] = mapped_column(Float, nullable=True)
     creation_date: Mapped[datetime] = mapped_column(
@@ -24,9 +34,17 @@ class UserModel(Base):
 
     posts = relationship("PostModel", back_populates="author", cascade="all, delete")
 
+    # credentials are unique and matched case-insensitively, see get_user
+    __table_args__ = (
+        Index("uq_users_username_lower", func.lower(username), unique=True),
+        Index("uq_users_email_lower", func.lower(email), unique=True),
+        Index("uq_users_phone_normalized", phone_normalized, unique=True),
+    )
+
     @validates("phone")
     def validate_phone(self, key, value):
         if value:
             if not re.match(r"^\+?\d{10,15}$", value):
                 raise ValueError("Invalid phone number format")
+        self.phone_normalized = normalize_phone(value) if value else None
         return value
@@ -1,11 +1,34 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
 from colorama import Fore
 from fastapi import FastAPI
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from contextlib import asynccontextmanager
 
-from parser import Parser
-from db.connection import get_db
+from parser import Parser, app as tg_client, sync_status
+from core.config import (
+    DAYS_TO_PARSE,
+    DATA_VERSION_POLL_INTERVAL,
+    DB_AUTO_MIGRATE,
+    IMAGE_GC_GRACE_MINUTES,
+    IMAGE_GC_INTERVAL_MINUTES,
+    INGEST_ENABLED,
+    INGEST_LOCK_KEY,
+    INGEST_LOCK_RETRY,
+    RETENTION_BATCH_SIZE,
+    RETENTION_INTERVAL_MINUTES,
+    STREAM_MAX_BACKOFF,
+    TG_IMAGES_QUOTA_MB,
+    TG_STREAMING_ENABLED,
+)
+from core.logger import televito_logger
+from db.connection import ParserSessionLocal, advisory_lock, init_db
 from routes import *
+from services.image_service import collect_image_garbage
+from services.tg_image_service import evict_tg_images
+from services.tg_post_service import purge_expired_tg_posts
+from services.version_service import poll_data_versions
 
 # Initialize the scheduler for periodic tasks
 scheduler = AsyncIOScheduler()
@@ -13,24 +36,145 @@ scheduler = AsyncIOScheduler()
 
 async def update_db_task():
     """Task that updates the database by parsing new posts."""
-    async for db in get_db():
-        async with db as session:
+    try:
+        async with ParserSessionLocal() as session:
             parser = Parser(session)
             await parser.update_db()
+    except Exception as e:
+        sync_status.update(state="failed", last_error=repr(e))
+        televito_logger.error(f"DB UPDATE FAILED: {e!r}")
+
+
+async def stream_task():
+    """Task that ingests new posts as they are published.
+
+    Restarted when it fails, after a delay doubling up to STREAM_MAX_BACKOFF
+    seconds while it keeps failing.
+    """
+    delay = 1
+    while True:
+        started_at = time.monotonic()
+        try:
+            async with ParserSessionLocal() as session:
+                parser = Parser(session)
+                await parser.stream()
+        except Exception as e:
+            if time.monotonic() - started_at > STREAM_MAX_BACKOFF:
+                delay = 1  # it had been streaming fine
+            televito_logger.error(f"STREAMING FAILED, RESTARTING IN {delay}s: {e!r}")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, STREAM_MAX_BACKOFF)
+
+
+async def retention_task():
+    """Task that deletes posts older than the parsing window and their photos."""
+    cutoff = datetime.now() - timedelta(days=DAYS_TO_PARSE)
+    try:
+        async with ParserSessionLocal() as session:
+            await purge_expired_tg_posts(
+                cutoff=cutoff, batch_size=RETENTION_BATCH_SIZE, db=session
+            )
+            await evict_tg_images(
+                cutoff=cutoff, quota_bytes=TG_IMAGES_QUOTA_MB * 2**20, db=session
+            )
+    except Exception as e:
+        televito_logger.error(f"RETENTION FAILED: {e!r}")
+
+
+async def image_gc_task():
+    """Task that deletes stored images no post or profile uses anymore."""
+    try:
+        async with ParserSessionLocal() as session:
+            await collect_image_garbage(
+                db=session, grace=timedelta(minutes=IMAGE_GC_GRACE_MINUTES)
+            )
+    except Exception as e:
+        televito_logger.error(f"IMAGE GC FAILED: {e!r}")
+
+
+async def run_ingestion():
+    """Streaming, the initial sync and the scheduled jobs; runs until cancelled."""
+    streaming = None
+    try:
+        if TG_STREAMING_ENABLED:
+            await tg_client.start()  # Shared with the reconciliation runs
+            streaming = asyncio.create_task(stream_task())
+
+        scheduler.add_job(
+            update_db_task, "cron", hour=12, timezone="Europe/Moscow", id="update_db"
+        )  # Daily reconciliation at 12:00 (Moscow time) of what streaming missed
+        scheduler.add_job(
+            retention_task,
+            "interval",
+            minutes=RETENTION_INTERVAL_MINUTES,
+            next_run_time=datetime.now(),
+            id="retention",
+        )  # Purge expired posts on startup and then periodically
+        scheduler.add_job(
+            image_gc_task,
+            "interval",
+            minutes=IMAGE_GC_INTERVAL_MINUTES,
+            id="image_gc",
+        )  # Delete unreferenced images, one worker is enough
+
+        await update_db_task()  # Initial DB update
+        await asyncio.Event().wait()
+    finally:
+        for job_id in ("update_db", "retention", "image_gc"):
+            if scheduler.get_job(job_id):
+                scheduler.remove_job(job_id)
+        if streaming:
+            streaming.cancel()
+            await asyncio.gather(streaming, return_exceptions=True)
+        if tg_client.is_connected:
+            await tg_client.stop()
+
+
+async def ingestion_task():
+    """Runs the ingestion in the one worker that holds the ingestion lock.
+
+    Other uvicorn workers only serve the API and retry the lock periodically,
+    so one of them takes over if the leader goes away.
+    """
+    while True:
+        try:
+            async with advisory_lock(INGEST_LOCK_KEY) as acquired:
+                if acquired:
+                    sync_status["role"] = "leader"
+                    televito_logger.info("THIS WORKER RUNS THE INGESTION")
+                    await run_ingestion()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            televito_logger.error(f"INGESTION STOPPED: {e!r}")
+        sync_status["role"] = "follower"
+        await asyncio.sleep(INGEST_LOCK_RETRY)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage the lifespan of the FastAPI app, including scheduled tasks."""
-    await update_db_task()  # Initial DB update on startup
-    scheduler.add_job(
-        update_db_task, "cron", hour=12, timezone="Europe/Moscow"
-    )  # Schedule daily DB update at 12:00 (Moscow time)
+    if DB_AUTO_MIGRATE:
+        await init_db()  # Apply pending migrations once, before serving requests
+
+    # The sync runs in the background so the API serves requests right away
+    ingestion = None
+    if INGEST_ENABLED:
+        ingestion = asyncio.create_task(ingestion_task())
+    else:
+        sync_status["role"] = "disabled"
+    # Cached counts and responses follow the writes of the ingestion worker
+    versions = asyncio.create_task(poll_data_versions(DATA_VERSION_POLL_INTERVAL))
     scheduler.start()
 
     try:
         yield  # Yield control to run the app
     finally:
+        versions.cancel()
+        await asyncio.gather(versions, return_exceptions=True)
+        if ingestion:
+            ingestion.cancel()
+            await asyncio.gather(ingestion, return_exceptions=True)
         scheduler.shutdown()
 
 
@@ -41,6 +185,9 @@ app.include_router(user_route, prefix="/users")
 app.include_router(tg_post_route, prefix="/tg_posts")
 app.include_router(post_route, prefix="/posts")
 app.include_router(category_route, prefix="/categories")
+app.include_router(metrics_route, prefix="/metrics")
+app.include_router(health_route, prefix="/health")
+app.include_router(image_route, prefix="/images")
 
 
 @app.get("/")
@@ -1,21 +1,165 @@
 import asyncio
+import time
 from datetime import datetime, timedelta
-from pyrogram import Client
+from pyrogram import Client, filters
+from pyrogram.errors import FloodWait
+from pyrogram.handlers import EditedMessageHandler, MessageHandler
 from pyrogram.types.messages_and_media.message import Message
-from sqlalchemy import func, select, delete
+from sqlalchemy import func, literal_column, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DataError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from core import metrics
+from core.cache import TTLCache, get_version
 from core.logger import televito_logger
-from db.models import TGPostModel
-from core.config import TG_API_HASH, TG_API_ID, TG_GROUP_NAME
-from parser_re import parse_text
+from core.rate_limiter import AdaptiveRateLimiter
+from core.response_cache import response_cache
+from db.connection import ParserSessionLocal
+from db.models import IngestStateModel, TGPostModel
+from services.tg_image_service import (
+    pending_tg_images,
+    register_tg_images,
+    store_tg_images,
+)
+from services.version_service import bump_data_version
+from core.config import (
+    DAYS_TO_PARSE,
+    MEDIA_GROUP_WAIT,
+    PARSER_BATCH_SIZE,
+    PARSER_FLUSH_INTERVAL,
+    PARSER_WRITE_QUEUE_SIZE,
+    PARSE_CACHE_SIZE,
+    PARSE_CACHE_WARM_ROWS,
+    TG_API_HASH,
+    TG_API_ID,
+    TG_CHANNELS,
+    TG_HISTORY_PAGE_SIZE,
+    TG_IMAGE_DOWNLOADS,
+    TG_IMAGE_MIRROR_ENABLED,
+    TG_MIN_REQUEST_INTERVAL,
+)
+from parser_re import (
+    PARSED_FIELDS,
+    caption_hash,
+    parse_status_lines,
+    parse_text,
+    status_lines,
+)
 
 app = Client("televito", api_hash=TG_API_HASH, api_id=TG_API_ID)
-DAYS_TO_PARSE = 6 * 90  # 6 months
+DEDUP_KEY = ("location", "area", "floor", "floors_in_building")
+# NOT NULL columns of tg_posts, a caption without them is not a listing
+REQUIRED_FIELDS = ("location", "price")
+
+# shared by every channel task, Telegram rate limits are per account
+rate_limiter = AdaptiveRateLimiter(min_interval=TG_MIN_REQUEST_INTERVAL)
+# photo downloads in flight, and one mirror draining tg_images at a time
+download_slots = asyncio.Semaphore(TG_IMAGE_DOWNLOADS)
+mirror_lock = asyncio.Lock()
+
+# progress of the history sync in this process, reported by /health/ready
+sync_status = {
+    "role": "pending",  # leader, follower or disabled, see main.ingestion_task
+    "state": "idle",  # idle, running, done or failed
+    "runs": 0,
+    "started_at": None,
+    "finished_at": None,
+    "last_error": None,
+    "channels": {},
+}
+
+# Moves reposted listings forward in one statement. Returns the requested ids
+# whose row still holds the same caption and whether each was bumped, with the
+# images of bumped rows. A missing id was deleted or overwritten by another
+# caption with the same dedup key.
+BUMP_QUERY = text(
+    """
+    WITH v AS (
+        SELECT * FROM unnest(
+            CAST(:ids AS BIGINT[]),
+            CAST(:hashes AS VARCHAR[]),
+            CAST(:dates AS TIMESTAMP[]),
+            CAST(:statuses AS DATE[])
+        ) AS v(id, caption_hash, publication_datetime, status)
+    ), bumped AS (
+        UPDATE tg_posts
+        SET publication_datetime = v.publication_datetime, status = v.status
+        FROM v
+        WHERE tg_posts.id = v.id
+            AND tg_posts.caption_hash = v.caption_hash
+            AND v.publication_datetime > tg_posts.publication_datetime
+        RETURNING tg_posts.id, tg_posts.images
+    )
+    SELECT
+        v.id,
+        bumped.id IS NOT NULL AS bumped,
+        bumped.images,
+        v.publication_datetime
+    FROM v
+    JOIN tg_posts ON tg_posts.id = v.id AND tg_posts.caption_hash = v.caption_hash
+    LEFT JOIN bumped ON bumped.id = v.id
+    """
+)
+
+
+class ParseCache:
+    """Caption hash -> parsed fields, status lines and the id of the stored post.
+
+    Channels repost the same listing many times; a hit skips parse_text and,
+    once the post id is known, the upsert too. Only the status depends on the
+    post date, it is recomputed from the cached status lines. Entries are
+    dropped when retention deletes rows, their post ids may be gone.
+    """
+
+    def __init__(self, maxsize: int):
+        self.entries = TTLCache(maxsize=maxsize)
+        self.purge_version = get_version("tg_posts_purge")
+        self.warmed = False
+
+    def get(self, key: str) -> dict | None:
+        version = get_version("tg_posts_purge")
+        if version != self.purge_version:
+            self.entries.clear()
+            self.purge_version = version
+        entry = self.entries.get(key)
+        metrics.increment("parse_cache.hits" if entry else "parse_cache.misses")
+        return entry
+
+    def set(self, key: str, parsed: dict, lines: list[str], post_id: int | None = None):
+        self.entries.set(key, {"parsed": parsed, "status_lines": lines, "post_id": post_id})
+        metrics.set_gauge("parse_cache.size", len(self.entries))
+
+    def set_post_id(self, key: str, post_id: int | None):
+        entry = self.entries.get(key)
+        if entry:
+            entry["post_id"] = post_id
+
+
+# shared by the streaming and the reconciliation parsers
+parse_cache = ParseCache(PARSE_CACHE_SIZE)
 
 
 class Parser:
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        batch_size: int = PARSER_BATCH_SIZE,
+        client: Client = app,
+        mirror: bool = TG_IMAGE_MIRROR_ENABLED,
+    ):
         self.db = db
+        self.batch_size = batch_size
+        self.client = client
+        # whether the photos of written posts are downloaded, see mirror_images
+        self.mirror = mirror
+        self.images_pending = asyncio.Event()
+        # (channel, message_id, model, received_at) waiting to be written
+        self.buffer: list[tuple[str, int, TGPostModel, float]] = []
+        self.totals = {"new": 0, "updated": 0, "skipped": 0}
+        # channel -> {"last", "top", "offset"} message ids, see IngestStateModel
+        self.states: dict[str, dict[str, int | None]] = {}
+        # channels that lost a batch in this run, see mark_dirty
+        self.dirty_channels: set[str] = set()
 
     @staticmethod
     def text_to_model(
@@ -23,6 +167,7 @@ class Parser:
         google_maps_url: str,
         images: list[str],
         post_datetime: datetime,
+        caption: str | None = None,
     ) -> TGPostModel:
         """Converts parsed text and metadata into a ParseModel object."""
         return TGPostModel(
@@ -30,101 +175,636 @@ class Parser:
             google_maps_url=google_maps_url,
             images=images,
             publication_datetime=post_datetime,
+            caption=caption,
         )
 
-    async def insert_data(self, item: TGPostModel):
-        """Inserts or updates a post in the database if needed."""
+    def messages_to_model(
+        self, messages: list[Message], post_datetime: datetime | None = None
+    ) -> TGPostModel | None:
+        """Builds a post from a captioned message and the photos of its media group.
+
+        messages are ordered newest first, like get_chat_history returns them.
+        A caption seen before is not parsed again; if its post is already
+        stored, the model keeps that id and flush only bumps the stored row.
+        """
+        post = next(message for message in messages if message.caption)
+        key = caption_hash(post.caption)
+        cached = parse_cache.get(key)
+        if cached:
+            try:
+                status = parse_status_lines(cached["status_lines"], post.date)
+            except Exception as e:
+                televito_logger.error(f"Error parsing post {post.date}: {e}\n{post.caption}")
+                return None
+            parsed_text = {**cached["parsed"], "status": status}
+        else:
+            parsed_text = parse_text(post.caption, post.date)
+            if not parsed_text:
+                return None
+            missing = [field for field in REQUIRED_FIELDS if parsed_text[field] is None]
+            if missing:
+                televito_logger.warning(
+                    f"Post {post.date} has no {', '.join(missing)}, skipped\n{post.caption}"
+                )
+                return None
+            parse_cache.set(key, parsed_text, status_lines(post.caption))
+
+        model = self.text_to_model(
+            parsed_text,
+            post.caption_entities[0].url,
+            [message.photo.file_id for message in messages if message.photo],
+            post_datetime or post.date,
+            post.caption,
+        )
+        model.caption_hash = key
+        if cached:
+            model.id = cached["post_id"]
+        return model
+
+    @staticmethod
+    def model_to_row(item: TGPostModel) -> dict:
+        """Converts a transient TGPostModel into a row dict for a Core insert."""
+        return {
+            column.key: getattr(item, column.key)
+            for column in TGPostModel.__table__.columns
+            if column.key != "id"
+        }
+
+    async def insert_batch(self, items: list[TGPostModel]) -> dict[str, int]:
+        """Upserts a chunk of posts with a single INSERT ... ON CONFLICT statement.
+
+        A post replaces the stored one only if it was published later, so the
+        NEW/UPDATED/SKIPPED accounting of the per-row path is preserved. The
+        caller commits.
+        """
+        counters = {"new": 0, "updated": 0, "skipped": 0}
+
+        # ON CONFLICT cannot touch the same row twice, keep the newest post per key
+        rows = {}
+        for item in items:
+            row = self.model_to_row(item)
+            key = tuple(row[column] for column in DEDUP_KEY)
+            if key in rows:
+                counters["skipped"] += 1
+                if rows[key]["publication_datetime"] >= row["publication_datetime"]:
+                    continue
+            rows[key] = row
+
+        if not rows:
+            return counters
+
+        query = insert(TGPostModel).values(list(rows.values()))
+        query = query.on_conflict_do_update(
+            index_elements=[getattr(TGPostModel, column) for column in DEDUP_KEY],
+            set_={
+                column: query.excluded[column]
+                for column in next(iter(rows.values()))
+                if column not in DEDUP_KEY
+            },
+            where=query.excluded.publication_datetime
+            > TGPostModel.publication_datetime,
+        ).returning(
+            TGPostModel.id,
+            TGPostModel.caption_hash,
+            TGPostModel.images,
+            TGPostModel.publication_datetime,
+            literal_column("xmax = 0").label("inserted"),
+        )
+
+        result = await self.db.execute(query)
+        written = result.all()
+        for row in written:
+            if row.caption_hash:
+                parse_cache.set_post_id(row.caption_hash, row.id)
+        if self.mirror:
+            await register_tg_images(written, self.db)
+
+        counters["new"] += sum(1 for row in written if row.inserted)
+        counters["updated"] += len(written) - counters["new"]
+        counters["skipped"] += len(rows) - len(written)
+        return counters
+
+    async def bump_batch(self, items: list[TGPostModel]) -> tuple[dict[str, int], list]:
+        """Moves the publication date of already stored posts forward.
+
+        Used for reposts found in the parse cache, only publication_datetime
+        and status change. Returns the counters and the items whose row no
+        longer holds their caption, the caller upserts those. The caller commits.
+        """
+        counters = {"new": 0, "updated": 0, "skipped": 0}
+        latest = {}
+        for item in items:
+            if item.id in latest:
+                counters["skipped"] += 1
+                if latest[item.id].publication_datetime >= item.publication_datetime:
+                    continue
+            latest[item.id] = item
+
         result = await self.db.execute(
-            select(TGPostModel).filter(
-                TGPostModel.location == item.location,
-                TGPostModel.area == item.area,
-                TGPostModel.floor == item.floor,
-                TGPostModel.floors_in_building == item.floors_in_building,
-            )
+            BUMP_QUERY,
+            {
+                "ids": list(latest),
+                "hashes": [item.caption_hash for item in latest.values()],
+                "dates": [item.publication_datetime for item in latest.values()],
+                "statuses": [item.status for item in latest.values()],
+            },
         )
+        rows = result.all()
+        found = {row.id: row.bumped for row in rows}
+        if self.mirror:
+            await register_tg_images([row for row in rows if row.bumped], self.db)
+        counters["updated"] += sum(found.values())
+        counters["skipped"] += len(found) - sum(found.values())
 
-        similar_post = result.scalars().first()
+        missing = [item for post_id, item in latest.items() if post_id not in found]
+        for item in missing:
+            parse_cache.set_post_id(item.caption_hash, None)
+            item.id = None
+        metrics.increment("parse_cache.bumps", len(latest))
+        return counters, missing
 
-        # if there is no similar post in the DB, add it to the DB
-        if not similar_post:
-            self.db.add(item)
-            televito_logger.info(
-                f"NEW POST ADDED TO THE DB. {item.location}, {item.area}, {item.publication_datetime}"
+    async def warm_parse_cache(self, limit: int = PARSE_CACHE_WARM_ROWS):
+        """Loads the most recent stored posts into the parse cache, once per process."""
+        if parse_cache.warmed or limit <= 0:
+            return
+        parse_cache.warmed = True
+        result = await self.db.execute(
+            select(
+                TGPostModel.id,
+                TGPostModel.caption,
+                TGPostModel.caption_hash,
+                *(getattr(TGPostModel, field) for field in PARSED_FIELDS),
             )
-            await self.db.commit()
-
-        # if the post in the DB is outdated, update it
-        elif item.publication_datetime > similar_post.publication_datetime:
-            changes = []
-            for key, value in item.__dict__.items():
-                if key != "_sa_instance_state" and value != getattr(similar_post, key):
-                    changes.append(f"{key}: {getattr(similar_post, key)} -> {value}")
-                    setattr(similar_post, key, value)
-            televito_logger.info(
-                f"UPDATING EXISTING POST IN THE DB. {item.location}, {item.area}, {item.publication_datetime}:"
-                + "\n"
-                + "\n".join(changes)
+            .where(TGPostModel.caption_hash.is_not(None))
+            .order_by(TGPostModel.publication_datetime.desc())
+            .limit(limit)
+        )
+        rows = result.all()
+        for row in reversed(rows):  # the most recent end up least likely evicted
+            parse_cache.set(
+                row.caption_hash,
+                {field: getattr(row, field) for field in PARSED_FIELDS},
+                status_lines(row.caption),
+                row.id,
             )
-            await self.db.commit()
+        televito_logger.info(f"PARSE CACHE WARMED WITH {len(rows)} POSTS")
 
-        # if the post in the DB is newer than the parsing post, skip it
-        else:
+    async def load_states(self, channels: list[str]):
+        result = await self.db.execute(
+            select(IngestStateModel).where(IngestStateModel.channel.in_(channels))
+        )
+        stored = {state.channel: state for state in result.scalars().all()}
+        for channel in channels:
+            state = stored.get(channel)
+            self.states[channel] = {
+                "last": state.last_message_id if state else None,
+                "top": state.run_top_message_id if state else None,
+                "offset": state.run_offset_message_id if state else None,
+            }
+
+    async def save_state(self, channel: str, **changes):
+        """Upserts the checkpoint of a channel, committed with the caller's batch.
+
+        changes override "last", "top" or "offset" of the in-memory state,
+        which the caller updates once the commit succeeded.
+        """
+        state = {**self.states[channel], **changes}
+        values = {
+            "last_message_id": state["last"],
+            "run_top_message_id": state["top"],
+            "run_offset_message_id": state["offset"],
+        }
+        query = insert(IngestStateModel).values(channel=channel, **values)
+        query = query.on_conflict_do_update(
+            index_elements=[IngestStateModel.channel],
+            set_={**values, "updated_at": func.now()},
+        )
+        await self.db.execute(query)
+
+    async def finish_channel(self, channel: str):
+        """Marks the run of a channel as complete, the next run stops at its top.
+
+        If a batch of the channel was dropped, the checkpoint stays where it
+        was and the next run reads the whole range again.
+        """
+        if self.buffer:
+            await self.flush()
+        state = self.states[channel]
+        if channel in self.dirty_channels:
+            televito_logger.warning(f"{channel} LOST A BATCH, ITS CHECKPOINT IS KEPT")
+        elif state["top"] is not None:
+            state["last"] = max(state["top"], state["last"] or 0)
+        state["top"] = state["offset"] = None
+        await self.save_state(channel)
+        await self.db.commit()
+
+    async def add(self, channel: str, message_id: int, item: TGPostModel, received_at: float):
+        """Buffers a post and writes the buffer once it reaches batch_size."""
+        self.buffer.append((channel, message_id, item, received_at))
+        if len(self.buffer) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> dict[str, int]:
+        """Writes the buffered posts to the database."""
+        entries, self.buffer = self.buffer, []
+        try:
+            counters = await self.write_entries(entries)
+        except Exception as e:
+            await self.db.rollback()
+            metrics.increment("ingest.write_errors")
+            televito_logger.error(f"FAILED TO WRITE A BATCH OF {len(entries)} POSTS: {e!r}")
+            await self.mark_dirty({entry[0] for entry in entries})
+            return {"new": 0, "updated": 0, "skipped": 0}
+
+        for key, value in counters.items():
+            self.totals[key] += value
+            metrics.increment(f"ingest.posts_{key}", value)
+        if counters["new"] or counters["updated"]:
+            await response_cache.bump("tg_posts")  # invalidates cached counts and responses
+            self.images_pending.set()
+        if entries:
+            written_at = time.perf_counter()
+            for entry in entries:
+                metrics.observe("ingest.post_latency", written_at - entry[3])
             televito_logger.info(
-                f"SKIPPED OUTDATED POST. {item.location}, {item.area}, {item.publication_datetime}"
+                f"BATCH OF {len(entries)} POSTS WRITTEN TO THE DB. NEW: {counters['new']}, "
+                f"UPDATED: {counters['updated']}, SKIPPED: {counters['skipped']}"
             )
+        return counters
 
-    async def delete_item(self, item: TGPostModel):
-        """Deletes an item from the database."""
-        query = delete(TGPostModel).where(TGPostModel == item)
-        await self.db.execute(query)
+    async def write_entries(self, entries: list) -> dict[str, int]:
+        """Writes posts and their checkpoints in one transaction.
+
+        A row the database rejects fails the whole statement, so the batch is
+        split in halves until that row is alone and dropped; the others are
+        still written.
+        """
+        try:
+            return await self.write_batch(entries)
+        except (DataError, IntegrityError) as e:
+            await self.db.rollback()
+            if len(entries) == 1:
+                channel, message_id, _, _ = entries[0]
+                metrics.increment("ingest.posts_rejected")
+                televito_logger.error(f"POST {message_id} OF {channel} REJECTED: {e.orig!r}")
+                return {"new": 0, "updated": 0, "skipped": 0}
+        half = len(entries) // 2
+        counters = await self.write_entries(entries[:half])
+        for key, value in (await self.write_entries(entries[half:])).items():
+            counters[key] += value
+        return counters
+
+    async def write_batch(self, entries: list) -> dict[str, int]:
+        items = [entry[2] for entry in entries if entry[2].id is None]
+        counters = {"new": 0, "updated": 0, "skipped": 0}
+        stored = [entry[2] for entry in entries if entry[2].id is not None]
+        if stored:
+            counters, missing = await self.bump_batch(stored)
+            items += missing
+        for key, value in (await self.insert_batch(items)).items():
+            counters[key] += value
+
+        # move the checkpoints below the written messages in the same transaction,
+        # streamed posts and channels that lost a batch do not move them
+        offsets = {}
+        for channel, message_id, _, _ in entries:
+            if channel in self.states and channel not in self.dirty_channels:
+                offsets[channel] = min(message_id, offsets.get(channel, message_id))
+        for channel, offset in offsets.items():
+            await self.save_state(channel, offset=offset)
+        if counters["new"] or counters["updated"]:
+            await bump_data_version("tg_posts", self.db)  # for the other workers
         await self.db.commit()
+        for channel, offset in offsets.items():
+            self.states[channel]["offset"] = offset
+        return counters
 
-    async def update_db(self):
-        """Fetches and updates database with posts from the Telegram chat."""
-        latest_item_date = await self.db.execute(
-            select(func.max(TGPostModel.publication_datetime))
-        )
-        latest_date = latest_item_date.scalar() or (
-            datetime.now() - timedelta(days=DAYS_TO_PARSE)
-        )
-        cutoffdata = datetime.now() - timedelta(days=DAYS_TO_PARSE)
+    async def mark_dirty(self, channels: set[str]):
+        """Remembers that channels lost a batch of posts.
 
-        result = select(TGPostModel).filter(
-            TGPostModel.publication_datetime < cutoffdata
-        )
-        outdated_items = await self.db.execute(result)
-        items_to_delete = outdated_items.scalars().all()
+        Their stored run is cleared right away, so even if this process dies
+        the next run walks from the newest message down to the last complete
+        checkpoint and fetches the dropped posts again.
+        """
+        channels = [channel for channel in channels if channel in self.states]
+        self.dirty_channels.update(channels)
+        try:
+            for channel in channels:
+                await self.save_state(channel, top=None, offset=None)
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            televito_logger.error(f"FAILED TO RESET THE CHECKPOINTS OF {channels}: {e!r}")
+
+    async def write_from_queue(self, queue: asyncio.Queue):
+        """Single DB writer for all channel tasks, runs until it gets None.
 
-        for item in items_to_delete:
-            await self.delete_item(item)
+        (channel, None, None, None) marks the end of a channel's run.
 
-        image_list = []
+        Flushes on batch_size or once the oldest buffered post has waited
+        PARSER_FLUSH_INTERVAL seconds. A failed batch is logged and dropped so
+        the producers never block on a dead consumer; its channels are marked
+        dirty so their posts are fetched again by the next run.
+        """
+        done = False
+        while not done:
+            timeout = PARSER_FLUSH_INTERVAL
+            if self.buffer:
+                timeout = max(0, self.buffer[0][3] + timeout - time.perf_counter())
+            try:
+                entry = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                entry = None  # write whatever is buffered
+            else:
+                done = entry is None
+            metrics.set_gauge("ingest.write_queue.depth", queue.qsize())
 
-        async with app:
-            async for post in app.get_chat_history(TG_GROUP_NAME):
-                post: Message
-                if post.date <= latest_date:
-                    televito_logger.info(
-                        f"THE DATABASE IS UP-TO-DATE AS OF {datetime.now()}"
+            try:
+                if entry is not None and entry[2] is None:
+                    await self.finish_channel(entry[0])
+                elif entry is not None:
+                    await self.add(*entry)
+                    if time.perf_counter() - self.buffer[0][3] >= PARSER_FLUSH_INTERVAL:
+                        await self.flush()
+                elif self.buffer:
+                    await self.flush()
+            except Exception as e:
+                await self.db.rollback()
+                metrics.increment("ingest.write_errors")
+                televito_logger.error(f"FAILED TO WRITE A BATCH OF POSTS: {e}")
+
+    async def fetch_history_page(self, channel: str, offset_id: int) -> list[Message]:
+        """One rate limited get_chat_history page, older than offset_id."""
+        while True:
+            await rate_limiter.acquire()
+            try:
+                page = [
+                    message
+                    async for message in self.client.get_chat_history(
+                        channel, limit=TG_HISTORY_PAGE_SIZE, offset_id=offset_id
+                    )
+                ]
+            except FloodWait as e:
+                televito_logger.warning(f"FLOOD WAIT {e.value}s ON {channel}")
+                rate_limiter.on_flood_wait(e.value)
+                continue
+            rate_limiter.on_success()
+            return page
+
+    async def fetch_media_group(self, chat_id: int, message_id: int) -> list[Message]:
+        """The rate limited messages of the media group message_id belongs to."""
+        while True:
+            await rate_limiter.acquire()
+            try:
+                messages = await self.client.get_media_group(chat_id, message_id)
+            except FloodWait as e:
+                televito_logger.warning(f"FLOOD WAIT {e.value}s ON A MEDIA GROUP")
+                rate_limiter.on_flood_wait(e.value)
+                continue
+            rate_limiter.on_success()
+            return list(messages)
+
+    async def download_image(self, file_id: str) -> bytes | None:
+        """One rate limited photo download, None if Telegram refuses it."""
+        async with download_slots:
+            while True:
+                await rate_limiter.acquire()
+                try:
+                    media = await self.client.download_media(file_id, in_memory=True)
+                except FloodWait as e:
+                    televito_logger.warning(f"FLOOD WAIT {e.value}s ON A PHOTO DOWNLOAD")
+                    rate_limiter.on_flood_wait(e.value)
+                    continue
+                except Exception as e:
+                    metrics.increment("tg_images.download_errors")
+                    televito_logger.warning(f"FAILED TO DOWNLOAD PHOTO {file_id}: {e!r}")
+                    return None
+                rate_limiter.on_success()
+                return bytes(media.getbuffer())
+
+    async def mirror_pending(self):
+        """Downloads every pending photo of tg_images, TG_IMAGE_DOWNLOADS at a time.
+
+        Uses its own session, self.db belongs to the writer. Errors are
+        logged, the photos stay pending for the next run.
+        """
+        try:
+            async with mirror_lock, ParserSessionLocal() as db:
+                while file_ids := await pending_tg_images(db, TG_IMAGE_DOWNLOADS * 8):
+                    started_at = time.perf_counter()
+                    downloads = await asyncio.gather(
+                        *(self.download_image(file_id) for file_id in file_ids)
                     )
+                    await store_tg_images(dict(zip(file_ids, downloads)), db)
+                    metrics.observe("tg_images.batch_time", time.perf_counter() - started_at)
+        except Exception as e:
+            metrics.increment("tg_images.mirror_errors")
+            televito_logger.error(f"PHOTO MIRROR FAILED: {e!r}")
+
+    async def mirror_images(self):
+        """Mirrors the photos of written posts in the background, until cancelled.
+
+        The writer registers photos in tg_images with the posts and wakes the
+        mirror after each commit. Pending photos survive restarts.
+        """
+        self.images_pending.set()  # left over by an earlier run
+        while True:
+            await self.images_pending.wait()
+            self.images_pending.clear()
+            await self.mirror_pending()
+
+    def start_mirror(self) -> asyncio.Task | None:
+        return asyncio.create_task(self.mirror_images()) if self.mirror else None
+
+    @staticmethod
+    async def stop_mirror(mirror: asyncio.Task | None):
+        if mirror:
+            mirror.cancel()
+            await asyncio.gather(mirror, return_exceptions=True)
+
+    async def ingest_channel(self, channel: str, queue: asyncio.Queue):
+        """Walks a channel's history from the newest message down to its checkpoint.
+
+        Without a checkpoint it goes back DAYS_TO_PARSE days. An interrupted run
+        resumes below the oldest message it had written.
+        """
+        started_at = time.perf_counter()
+        parsed = 0
+        group = []
+        state = self.states[channel]
+        cutoff = datetime.now() - timedelta(days=DAYS_TO_PARSE)
+
+        if state["offset"] is None:
+            state["top"] = None
+        offset_id = state["offset"] or 0
+        if offset_id:
+            televito_logger.info(f"RESUMING {channel} BELOW MESSAGE {offset_id}")
+
+        while True:
+            page = await self.fetch_history_page(channel, offset_id)
+            if not page:
+                break
+            if state["top"] is None:
+                state["top"] = page[0].id
+            offset_id = page[-1].id
+            metrics.increment(f"ingest.{channel}.messages", len(page))
+
+            reached_checkpoint = False
+            for post in page:
+                if (state["last"] and post.id <= state["last"]) or post.date < cutoff:
+                    reached_checkpoint = True
                     break
 
-                # add the last image to the image_list and parse the caption of the image
+                # the captioned message closes its media group, parse the caption
                 if post.caption:
-                    image_list.append(post.photo.file_id)
-                    parsed_text = parse_text(post.caption, post.date)
-                    if parsed_text:
-                        model = self.text_to_model(
-                            parsed_text,
-                            post.caption_entities[0].url,
-                            image_list,
-                            post.date,
-                        )
-                        await self.insert_data(model)
-                        # timeout to avoid flooding Telegram API with requests
-                        await asyncio.sleep(0.07)
-                    image_list = []
-
-                # append the message to image_list if it's a photo
+                    group.append(post)
+                    model = self.messages_to_model(group)
+                    if model:
+                        await queue.put((channel, post.id, model, time.perf_counter()))
+                        parsed += 1
+                        metrics.increment(f"ingest.{channel}.posts_parsed")
+                    else:
+                        metrics.increment(f"ingest.{channel}.parse_errors")
+                    group = []
+
+                # collect the photos of the media group
                 elif post.photo:
-                    image_list.append(post.photo.file_id)
+                    group.append(post)
+
+            metrics.set_gauge(
+                f"ingest.{channel}.posts_per_second",
+                parsed / (time.perf_counter() - started_at),
+            )
+            metrics.set_gauge(f"ingest.{channel}.oldest_message_date", post.date.timestamp())
+            if reached_checkpoint:
+                break
+
+        televito_logger.info(f"{channel} IS UP-TO-DATE AS OF {datetime.now()}")
+        await queue.put((channel, None, None, None))
+
+    async def update_db(self, channels: list[str] = TG_CHANNELS) -> dict[str, int]:
+        """Fetches and updates database with posts from the Telegram channels.
+
+        Every channel is walked by its own task; parsed posts go through one
+        bounded queue to a single writer that upserts them in batches. Their
+        photos are mirrored meanwhile, the rest once the writer is done.
+        """
+        sync_status.update(state="running", started_at=datetime.now(), last_error=None)
+        sync_status["channels"] = self.states
+        await self.warm_parse_cache()
+        await self.load_states(channels)
+
+        queue = asyncio.Queue(maxsize=PARSER_WRITE_QUEUE_SIZE)
+        writer = asyncio.create_task(self.write_from_queue(queue))
+
+        # the client may already be running for streaming ingestion
+        started_here = not self.client.is_connected
+        if started_here:
+            await self.client.start()
+        mirror = self.start_mirror()
+        try:
+            results = await asyncio.gather(
+                *(self.ingest_channel(channel, queue) for channel in channels),
+                return_exceptions=True,
+            )
+            await queue.put(None)
+            await writer
+            # the photos of the last batches still need the client
+            await self.stop_mirror(mirror)
+            if self.mirror:
+                await self.mirror_pending()
+        finally:
+            await self.stop_mirror(mirror)
+            if started_here:
+                await self.client.stop()
+        for channel, result in zip(channels, results):
+            if isinstance(result, Exception):
+                metrics.increment(f"ingest.{channel}.errors")
+                televito_logger.error(f"FAILED TO INGEST {channel}: {result!r}")
+                sync_status["last_error"] = f"{channel}: {result!r}"
+
+        sync_status["runs"] += 1
+        sync_status.update(
+            state="failed" if sync_status["last_error"] else "done",
+            finished_at=datetime.now(),
+        )
+        televito_logger.info(
+            f"PARSING FINISHED. NEW: {self.totals['new']}, "
+            f"UPDATED: {self.totals['updated']}, SKIPPED: {self.totals['skipped']}"
+        )
+        return self.totals
+
+    async def stream(self, channels: list[str] = TG_CHANNELS):
+        """Ingests new and edited posts as Telegram pushes them, until cancelled.
+
+        The client must be started. Photos of a media group arrive as separate
+        messages, so they are collected for MEDIA_GROUP_WAIT seconds before the
+        group is parsed. An edited post is stored with its edit date, so it
+        replaces the earlier version of the listing.
+        """
+        await self.warm_parse_cache()
+        queue = asyncio.Queue(maxsize=PARSER_WRITE_QUEUE_SIZE)
+        writer = asyncio.create_task(self.write_from_queue(queue))
+        mirror = self.start_mirror()
+        media_groups: dict[str, list[Message]] = {}
+        pending = set()
+
+        async def enqueue(messages: list[Message], post_datetime: datetime | None = None):
+            received_at = time.perf_counter()
+            channel = messages[0].chat.username or str(messages[0].chat.id)
+            messages.sort(key=lambda message: message.id, reverse=True)
+            if not any(message.caption for message in messages):
+                return
+            model = self.messages_to_model(messages, post_datetime)
+            if not model:
+                metrics.increment(f"ingest.{channel}.parse_errors")
+                return
+            caption_id = next(message.id for message in messages if message.caption)
+            await queue.put((channel, caption_id, model, received_at))
+            metrics.increment(f"ingest.{channel}.posts_streamed")
+
+        async def enqueue_media_group(media_group_id: str):
+            await asyncio.sleep(MEDIA_GROUP_WAIT)
+            await enqueue(media_groups.pop(media_group_id))
+
+        async def on_new_message(client: Client, message: Message):
+            if not message.media_group_id:
+                await enqueue([message])
+            elif message.media_group_id in media_groups:
+                media_groups[message.media_group_id].append(message)
+            else:
+                media_groups[message.media_group_id] = [message]
+                task = asyncio.create_task(enqueue_media_group(message.media_group_id))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+        async def on_edited_message(client: Client, message: Message):
+            if not message.caption:
+                return
+            messages = [message]
+            if message.media_group_id:
+                try:
+                    messages = await self.fetch_media_group(message.chat.id, message.id)
+                except Exception as e:
+                    # the update_db reconciliation picks the edit up later
+                    metrics.increment("ingest.stream_errors")
+                    televito_logger.warning(f"FAILED TO FETCH EDITED MEDIA GROUP: {e!r}")
+                    return
+            await enqueue(messages, message.edit_date or message.date)
+
+        chats = filters.chat(channels)
+        handlers = [
+            self.client.add_handler(MessageHandler(on_new_message, chats)),
+            self.client.add_handler(EditedMessageHandler(on_edited_message, chats)),
+        ]
+        televito_logger.info(f"STREAMING NEW POSTS FROM {', '.join(channels)}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            for handler, group in handlers:
+                self.client.remove_handler(handler, group)
+            for task in list(pending):
+                task.cancel()
+            await queue.put(None)
+            await writer
+            await self.stop_mirror(mirror)
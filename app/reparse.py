@@ -0,0 +1,169 @@
+"""Re-parses the stored tg_posts captions with the current parse_text rules.
+
+Rows are streamed through a server-side cursor in chunks, parsed on a
+process pool and written back with bulk UPDATEs by primary key, so the
+table is never loaded into memory. Rows stored before captions were kept
+(caption IS NULL) are skipped. Every committed chunk bumps the tg_posts
+data version, so the API drops its cached responses and counts.
+
+    cd app && python reparse.py [--chunk-size 2000] [--workers 4] [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import DataError, IntegrityError
+
+from core.logger import televito_logger
+from db.connection import ParserSessionLocal, parser_engine
+from db.models import TGPostModel
+from parser_re import PARSED_FIELDS, parse_text
+from services.version_service import bump_data_version
+
+# unique index the parser upserts on, see TGPostModel
+DEDUP_KEY = "uq_tg_posts_dedup_key"
+
+
+def reparse_chunk(rows: list[tuple[int, str, datetime]]) -> list[dict | None]:
+    """Runs in a worker process."""
+    return [parse_text(caption, post_date) for _, caption, post_date in rows]
+
+
+def is_dedup_conflict(e: IntegrityError) -> bool:
+    # asyncpg's exception is the cause of the DBAPI adapter's
+    return getattr(e.orig.__cause__, "constraint_name", None) == DEDUP_KEY
+
+
+class Reparser:
+    def __init__(self, dry_run: bool = False):
+        self.dry_run = dry_run
+        self.changed_fields = Counter()
+        self.stats = Counter()
+        self.examples = []
+
+    def diff(self, rows, results) -> list[dict]:
+        """Collects the rows whose parsed fields changed."""
+        updates = []
+        for row, result in zip(rows, results):
+            self.stats["rows"] += 1
+            if result is None:
+                self.stats["parse_errors"] += 1
+                continue
+            changed = [field for field in PARSED_FIELDS if result[field] != getattr(row, field)]
+            if not changed:
+                continue
+            self.stats["changed"] += 1
+            self.changed_fields.update(changed)
+            if len(self.examples) < 10:
+                self.examples.append(
+                    (row.id, {f: (getattr(row, f), result[f]) for f in changed})
+                )
+            updates.append({"id": row.id, **{f: result[f] for f in PARSED_FIELDS}})
+        return updates
+
+    async def write(self, updates: list[dict]):
+        if not updates or self.dry_run:
+            return
+        async with ParserSessionLocal() as db:
+            try:
+                await db.execute(update(TGPostModel), updates)
+                await bump_data_version("tg_posts", db)
+                await db.commit()
+                self.stats["updated"] += len(updates)
+                return
+            except (DataError, IntegrityError):
+                await db.rollback()
+
+            # skip the rows whose new fields collide with another post's dedup
+            # key or break another constraint
+            updated = 0
+            for values in updates:
+                try:
+                    await db.execute(update(TGPostModel), [values])
+                    await db.commit()
+                    updated += 1
+                except (DataError, IntegrityError) as e:
+                    await db.rollback()
+                    if isinstance(e, IntegrityError) and is_dedup_conflict(e):
+                        self.stats["dedup_conflicts"] += 1
+                    else:
+                        self.stats["rejected"] += 1
+                        televito_logger.error(f"REPARSE OF POST {values['id']} REJECTED: {e.orig!r}")
+            if updated:
+                await bump_data_version("tg_posts", db)
+                await db.commit()
+            self.stats["updated"] += updated
+
+    async def run(self, chunk_size: int, workers: int):
+        loop = asyncio.get_running_loop()
+        columns = [
+            TGPostModel.id,
+            TGPostModel.caption,
+            TGPostModel.publication_datetime,
+            *(getattr(TGPostModel, field) for field in PARSED_FIELDS),
+        ]
+        query = (
+            select(*columns)
+            .where(TGPostModel.caption.is_not(None))
+            .order_by(TGPostModel.id)
+            .execution_options(yield_per=chunk_size)
+        )
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            async with ParserSessionLocal() as reader:
+                result = await reader.stream(query)
+                # keep up to `workers` chunks parsing while the next one streams in
+                in_flight = deque()
+                async for rows in result.partitions(chunk_size):
+                    batch = [(row.id, row.caption, row.publication_datetime) for row in rows]
+                    in_flight.append((rows, loop.run_in_executor(pool, reparse_chunk, batch)))
+                    if len(in_flight) >= workers:
+                        await self.finish_chunk(*in_flight.popleft())
+                while in_flight:
+                    await self.finish_chunk(*in_flight.popleft())
+
+    async def finish_chunk(self, rows, future):
+        await self.write(self.diff(rows, await future))
+        televito_logger.info(
+            f"REPARSE: {self.stats['rows']} ROWS, {self.stats['changed']} CHANGED"
+        )
+
+    def summary(self) -> str:
+        lines = [
+            f"rows scanned:    {self.stats['rows']}",
+            f"parse errors:    {self.stats['parse_errors']}",
+            f"rows changed:    {self.stats['changed']}",
+            f"rows updated:    {self.stats['updated']}{' (dry run)' if self.dry_run else ''}",
+            f"dedup conflicts: {self.stats['dedup_conflicts']}",
+            f"rows rejected:   {self.stats['rejected']}",
+            "changed fields:",
+        ]
+        lines += [f"  {field}: {count}" for field, count in self.changed_fields.most_common()]
+        lines.append("examples:")
+        for post_id, changes in self.examples:
+            lines.append(f"  #{post_id}: " + ", ".join(
+                f"{field} {old!r} -> {new!r}" for field, (old, new) in changes.items()
+            ))
+        return "\n".join(lines)
+
+
+async def main(chunk_size: int, workers: int, dry_run: bool):
+    reparser = Reparser(dry_run=dry_run)
+    try:
+        await reparser.run(chunk_size, workers)
+    finally:
+        await parser_engine.dispose()
+    print(reparser.summary())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.chunk_size, args.workers, args.dry_run))
@@ -2,3 +2,6 @@ from .user_route import router as user_route
 from .tg_post_route import router as tg_post_route
 from .post_route import router as post_route
 from .category_route import router as category_route
+from .metrics_route import router as metrics_route
+from .health_route import router as health_route
+from .image_route import router as image_route
@@ -1,29 +1,23 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+from core.response_cache import cached
 from db.connection import get_db
-from db.models import CategoryModel
+from services.category_service import get_parent_categories, get_subcategories
 
 router = APIRouter()
 
 
 @router.get("/")
-async def get_parent_categories(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(CategoryModel).filter(CategoryModel.parent_id == None)
-    )
-    categories = result.scalars().all()
-
-    return categories
+@cached("categories")
+async def parent_categories_list(request: Request, db: AsyncSession = Depends(get_db)):
+    return await get_parent_categories(db=db)
 
 
 @router.get("/{parent_id}/subcategories")
-async def get_subcategories(parent_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(CategoryModel).filter(CategoryModel.parent_id == parent_id)
-    )
-    subcategories = result.scalars().all()
-
-    return subcategories
+@cached("categories")
+async def subcategories_list(
+    request: Request, parent_id: int, db: AsyncSession = Depends(get_db)
+):
+    return await get_subcategories(parent_id=parent_id, db=db)
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import metrics
+from db.connection import get_db
+from parser import sync_status
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def live():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready(
+    require_sync: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        await db.execute(text("SELECT 1"))
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is unavailable",
+        )
+
+    response = {
+        "ready": True,
+        "sync": sync_status,
+        "progress": metrics.snapshot("ingest.")["gauges"],
+    }
+    # a probe can opt in to wait for the first completed sync of this worker
+    if require_sync and sync_status["role"] == "leader" and not sync_status["runs"]:
+        response["ready"] = False
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=response)
+
+    return response
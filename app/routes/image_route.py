@@ -0,0 +1,28 @@
+import os
+import re
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from core.config import IMAGE_MAX_AGE
+from services.image_service import STORE_DIR
+
+router = APIRouter()
+
+# <sha256>.<ext> of a stored image or <sha256>_<variant>.webp of its variants
+IMAGE_NAME = re.compile(r"[0-9a-f]{64}(_(thumb|medium|full))?\.[a-z0-9]+")
+
+
+# Stored image or variant by file name, as listed in image_variants
+@router.get("/{name}", name="stored_image")
+async def get_stored_image(name: str, request: Request):
+    path = os.path.join(STORE_DIR, name[:2], name[2:4], name)
+    if not IMAGE_NAME.fullmatch(name) or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    # stored by content, a name always holds the same bytes
+    etag = f'"{os.path.splitext(name)[0]}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={IMAGE_MAX_AGE}, immutable"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers)
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+
+from core import metrics
+from db.connection import pool_stats
+
+router = APIRouter()
+
+
+@router.get("/")
+async def get_metrics(prefix: str = ""):
+    return {"metrics": metrics.snapshot(prefix), "db_pools": pool_stats()}
@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.security import oauth2_scheme, verify_access_token
 from db.connection import get_db
+from db.models import UserModel
 from schemas import PostResponse, PostCreate, PostUpdate
 from services.post_service import (
     get_posts_list,
     get_post,
     create_post_logic,
+    process_post_images,
     update_post_logic,
 )
+from services.user_service import get_current_user
 
 router = APIRouter()
 
@@ -19,18 +21,16 @@ router = APIRouter()
 
 @router.post("/")
 async def create_post(
-    request: Request,
+    background_tasks: BackgroundTasks,
     post_schema: PostCreate = Depends(),
-    token: str = Depends(oauth2_scheme),
+    user: UserModel = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    if not token:
-        token = request.cookies.get("access_token")
-
-    username = verify_access_token(token=token)
     post, large_files = await create_post_logic(
-        post_schema=post_schema, username=username, db=db
+        post_schema=post_schema, user=user, db=db
     )
+    # thumbnails are rendered after the response is sent
+    background_tasks.add_task(process_post_images, post.id)
 
     response = {
         "post": PostResponse.model_validate(post, from_attributes=True),
@@ -42,16 +42,10 @@ async def create_post(
 
 @router.get("/my_posts")
 async def posts_list(
-    request: Request,
-    token: str = Depends(oauth2_scheme),
+    user: UserModel = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    if not token:
-        token = request.cookies.get("access_token")
-
-    username = verify_access_token(token=token)
-
-    posts_model = await get_posts_list(db=db, username=username)
+    posts_model = await get_posts_list(db=db, user=user)
     posts = [
         PostResponse.model_validate(post_model, from_attributes=True)
         for post_model in posts_model
@@ -71,20 +65,16 @@ async def show_post(post_id: int, db: AsyncSession = Depends(get_db)):
 
 @router.put("/{post_id}")
 async def update_post(
-    request: Request,
+    background_tasks: BackgroundTasks,
     post_id: int,
     update_data: PostUpdate = Depends(),
-    token: str = Depends(oauth2_scheme),
+    user: UserModel = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    if not token:
-        token = request.cookies.get("access_token")
-
-    username = verify_access_token(token=token)
-
     post, large_images = await update_post_logic(
-        post_id=post_id, username=username, update_data=update_data, db=db
+        post_id=post_id, user=user, update_data=update_data, db=db
     )
+    background_tasks.add_task(process_post_images, post.id)
 
     return {
         "post": PostResponse.model_validate(post, from_attributes=True),
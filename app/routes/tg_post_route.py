@@ -1,17 +1,32 @@
+import os
+from datetime import date
 from typing import Literal
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from core.config import TG_IMAGE_MAX_AGE
+from core.images import variant_path
+from core.response_cache import cached
 from db.connection import get_db
 from db.models import TGPostModel
 from schemas import TGPostSchema, ShortTGPostSchema
-from services.tg_post_service import get_filtered_tg_posts
+from services.tg_post_service import (
+    build_tg_posts_query,
+    count_cache_key,
+    count_tg_posts,
+    get_filtered_tg_posts,
+    get_tg_posts_page_by_cursor,
+)
+from services.tg_image_service import get_tg_image, tg_image_path
 
 router = APIRouter()
 
 
+# status=today means another date tomorrow
 @router.get("/", name="tg_posts_list")
+@cached("tg_posts", vary=lambda request: date.today().isoformat())
 async def tg_posts_list(
     request: Request,
     status: str | None = Query(None, pattern=r"\d{4}-\d{1,2}-\d{1,2}|today"),
@@ -28,9 +43,66 @@ async def tg_posts_list(
     sort_order: bool | None = Query(None),  # 0 - desc, 1 - asc
     page_num: int | None = Query(1, ge=1),
     limit: int | None = Query(20, ge=1),
+    pagination: Literal["offset", "cursor"] = Query("offset"),
+    cursor: str | None = Query(None),
+    count: Literal["exact", "estimated", "capped", "none"] | None = Query(None),
     db: AsyncSession = Depends(get_db),
 ):
-    total, items = await get_filtered_tg_posts(
+    # Keyset pagination: seek past the cursor instead of skipping rows
+    if cursor is not None or pagination == "cursor":
+        query = build_tg_posts_query(
+            status=status,
+            price=price,
+            duration=duration,
+            is_new=is_new,
+            rooms=rooms,
+            area=area,
+            floor=floor,
+            pets_allowed=pets_allowed,
+        )
+        items, next_cursor, prev_cursor = await get_tg_posts_page_by_cursor(
+            query=query,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            cursor=cursor,
+            limit=limit,
+            db=db,
+        )
+        # cursor mode does not count unless asked to
+        total, total_mode = await count_tg_posts(
+            query,
+            count_cache_key(
+                status=status,
+                price=price,
+                duration=duration,
+                is_new=is_new,
+                rooms=rooms,
+                area=area,
+                floor=floor,
+                pets_allowed=pets_allowed,
+            ),
+            count or "none",
+            db,
+        )
+        # the links keep every filter and sort param of the current request
+        url = request.url.remove_query_params(["page_num", "cursor"])
+        url = url.include_query_params(pagination="cursor")
+        return {
+            "items": [ShortTGPostSchema.from_orm_model(item) for item in items],
+            "pagination": {
+                "next": str(url.include_query_params(cursor=next_cursor))
+                if next_cursor
+                else "",
+                "prev": str(url.include_query_params(cursor=prev_cursor))
+                if prev_cursor
+                else "",
+            },
+            "limit": limit,
+            "total": total,
+            "total_mode": total_mode,
+        }
+
+    total, total_mode, has_next, items = await get_filtered_tg_posts(
         status=status,
         price=price,
         duration=duration,
@@ -44,6 +116,7 @@ async def tg_posts_list(
         page_num=page_num,
         limit=limit,
         db=db,
+        count=count or "exact",
     )
 
     response = {
@@ -52,28 +125,60 @@ async def tg_posts_list(
         "page": page_num,
         "limit": limit,
         "total": total,
+        "total_mode": total_mode,
     }
 
     # Check for the previous page link
     if page_num > 1:
-        response["pagination"][
-            "prev"
-        ] = f"{request.url_for('tg_posts_list')}?page_num={page_num-1}&limit={limit}"
+        response["pagination"]["prev"] = str(
+            request.url.include_query_params(page_num=page_num - 1, limit=limit)
+        )
 
     # Check for the next page link
-    if total >= limit * page_num:
-        response["pagination"][
-            "next"
-        ] = f"{request.url_for('tg_posts_list')}?page_num={page_num+1}&limit={limit}"
+    if has_next:
+        response["pagination"]["next"] = str(
+            request.url.include_query_params(page_num=page_num + 1, limit=limit)
+        )
 
     return response
 
 
+# Mirrored photo of a post, by the file_id listed in its images. A variant
+# not rendered (yet) falls back to the original.
+@router.get("/images/{file_id}", name="tg_post_image")
+async def get_tg_post_image(
+    file_id: str,
+    request: Request,
+    variant: Literal["thumb", "medium", "full"] | None = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    image = await get_tg_image(file_id, db)
+    path = tg_image_path(image.sha256) if image else None
+    if not path or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if variant and os.path.exists(variant_path(path, variant)):
+        path = variant_path(path, variant)
+    else:
+        variant = None
+
+    # the content behind a file_id never changes, clients may keep it
+    etag = f'"{image.sha256}_{variant}"' if variant else f'"{image.sha256}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={TG_IMAGE_MAX_AGE}, immutable",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers)
+
+
 # Get post details by ID
 @router.get("/{post_id}", response_model=TGPostSchema)
-async def get_tg_post(post_id: int, db: AsyncSession = Depends(get_db)):
+@cached("tg_posts")
+async def get_tg_post(request: Request, post_id: int, db: AsyncSession = Depends(get_db)):
     post = await db.execute(select(TGPostModel).filter(TGPostModel.id == post_id))
     post = post.scalar_one_or_none()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    return post
+    return TGPostSchema.model_validate(post, from_attributes=True)
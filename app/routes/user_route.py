@@ -1,5 +1,6 @@
 from fastapi import (
     APIRouter,
+    BackgroundTasks,
     Depends,
     Request,
     Response,
@@ -7,8 +8,8 @@ from fastapi import (
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.security import oauth2_scheme, verify_access_token
 from db.connection import get_db
+from db.models import UserModel
 from schemas.user_schema import (
     UserChangePassword,
     UserCreate,
@@ -21,7 +22,9 @@ from services.user_service import (
     change_user_password_logic,
     create_user_logic,
     delete_user_logic,
+    get_current_user,
     get_user,
+    process_profile_photo,
     update_user_logic,
 )
 
@@ -70,52 +73,33 @@ async def show_profile(user_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/profile")
-async def my_profile(
-    request: Request,
-    token=Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db),
-):
-    if not token:
-        token = request.cookies.get("access_token")
-
-    username = verify_access_token(token=token)
-
-    user = await get_user(username=username, db=db)
-
+async def my_profile(user: UserModel = Depends(get_current_user)):
     return UserProfileResponse.model_validate(user, from_attributes=True)
 
 
 @router.put("/profile", response_model=UserProfileResponse)
 async def update_profile(
-    request: Request,
+    background_tasks: BackgroundTasks,
     user_update: UserUpdate = Depends(),
-    token: str = Depends(oauth2_scheme),
+    user: UserModel = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    if not token:
-        token = request.cookies.get("access_token")
-
-    username = verify_access_token(token=token)
-
-    user = await update_user_logic(username=username, update_data=user_update, db=db)
+    photo_changed = bool(user_update.profile_photo)
+    user = await update_user_logic(user=user, update_data=user_update, db=db)
+    if photo_changed:
+        background_tasks.add_task(process_profile_photo, user.id)
 
     return UserProfileResponse.model_validate(user, from_attributes=True)
 
 
 @router.put("/change-password", response_model=UserProfileResponse)
 async def change_user_password(
-    request: Request,
     password_schema: UserChangePassword = Depends(),
-    token: str = Depends(oauth2_scheme),
+    user: UserModel = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    if not token:
-        token = request.cookies.get("access_token")
-
-    username = verify_access_token(token=token)
-
     user = await change_user_password_logic(
-        username=username, password_schema=password_schema, db=db
+        user=user, password_schema=password_schema, db=db
     )
 
     return UserProfileResponse.model_validate(user, from_attributes=True)
@@ -125,15 +109,11 @@ async def change_user_password(
 async def delete_my_profile(
     request: Request,
     password_schema: UserDelete = Depends(),
-    token: str = Depends(oauth2_scheme),
+    user: UserModel = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    if not token:
-        token = request.cookies.get("access_token")
-
-    username = verify_access_token(token=token)
     deletion_response = await delete_user_logic(
-        username=username, password=password_schema.password, db=db
+        user=user, password=password_schema.password, db=db
     )
     request.cookies.clear()
 
@@ -3,6 +3,8 @@ from fastapi import UploadFile
 from pydantic import BaseModel, Field, field_validator, root_validator
 from typing import Optional
 
+from core.images import image_url
+
 
 class PostResponse(BaseModel):
     id: int
@@ -12,11 +14,24 @@ class PostResponse(BaseModel):
     description: Optional[str] = None
     is_new: Optional[bool] = None
     images: list[str]
+    # original path -> {"thumb", "medium", "full"} URLs, filled in after upload
+    image_variants: Optional[dict[str, dict[str, str]]] = None
     publication_datetime: datetime
     author_id: int
     category_id: int
     subcategory_id: Optional[int] = None
 
+    @field_validator("image_variants")
+    @classmethod
+    def variant_urls(cls, value):
+        # stored as paths on disk
+        if not value:
+            return value
+        return {
+            path: {name: image_url(variant) for name, variant in variants.items()}
+            for path, variants in value.items()
+        }
+
 
 class PostCreate(BaseModel):
     location: str
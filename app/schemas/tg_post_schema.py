@@ -1,7 +1,9 @@
 from datetime import date, datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
 from typing import Optional
 
+from core.images import tg_image_url
+
 
 class ShortTGPostSchema(BaseModel):
     id: int
@@ -9,12 +11,13 @@ class ShortTGPostSchema(BaseModel):
     price: float
     status: date
     publication_datetime: datetime
+    # URL of the thumb of the first photo
     first_image: Optional[str] = None
 
     @classmethod
     def from_orm_model(cls, orm_model):
         images_list = orm_model.images or []
-        first_image = images_list[0] if images_list else None
+        first_image = tg_image_url(images_list[0], "thumb") if images_list else None
         return cls.model_construct(
             id=orm_model.id,
             location=orm_model.location,
@@ -41,3 +44,9 @@ class TGPostSchema(BaseModel):
     parking: Optional[str]
     images: list[str]
     publication_datetime: datetime
+
+    # the mirrored photos, in the order of images
+    @computed_field
+    @property
+    def image_urls(self) -> list[str]:
+        return [tg_image_url(file_id) for file_id in self.images]
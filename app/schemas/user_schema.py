@@ -1,8 +1,10 @@
 from datetime import datetime
 from fastapi import File, UploadFile
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional
 
+from core.images import image_url
+
 
 class UserProfileResponse(BaseModel):
     id: int
@@ -10,10 +12,19 @@ class UserProfileResponse(BaseModel):
     email: EmailStr
     phone: Optional[str] = None
     profile_photo: Optional[str] = None
+    profile_photo_variants: Optional[dict[str, str]] = None
     description: Optional[str] = None
     rating: Optional[float] = None
     creation_date: datetime
 
+    @field_validator("profile_photo_variants")
+    @classmethod
+    def variant_urls(cls, value):
+        # stored as paths on disk
+        if not value:
+            return value
+        return {name: image_url(variant) for name, variant in value.items()}
+
 
 class UserCreate(BaseModel):
     username: str = Field(..., min_length=4, max_length=32)
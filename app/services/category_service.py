@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import metrics
+from core.cache import get_version
+from core.config import CATEGORY_TREE_TTL
+from db.models import CategoryModel
+
+
+class CategoryTree:
+    """The whole category hierarchy in memory, it is small and rarely changes.
+
+    The app never writes categories, they are managed in the database.
+    Reloaded after CATEGORY_TREE_TTL seconds, or once the "categories" data
+    version changed: a script changing categories should call
+    bump_data_version("categories", db) in its transaction.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.lock = asyncio.Lock()
+        self.loaded_at: float | None = None
+        self.version: int | None = None
+        # id -> {"id", "name", "parent_id"}, as the endpoints return them
+        self.categories: dict[int, dict] = {}
+        # parent id -> ids of its subcategories, None holds the parents
+        self.children: dict[int | None, set[int]] = {}
+
+    def is_stale(self) -> bool:
+        return (
+            self.loaded_at is None
+            or time.monotonic() - self.loaded_at > self.ttl
+            or self.version != get_version("categories")
+        )
+
+    async def load(self, db: AsyncSession) -> "CategoryTree":
+        """The tree, reloaded first if stale; concurrent callers share one reload."""
+        if not self.is_stale():
+            return self
+        async with self.lock:
+            if self.is_stale():
+                version = get_version("categories")
+                result = await db.execute(
+                    select(
+                        CategoryModel.id, CategoryModel.name, CategoryModel.parent_id
+                    ).order_by(CategoryModel.id)
+                )
+                categories, children = {}, {None: set()}
+                for row in result.all():
+                    categories[row.id] = {
+                        "id": row.id,
+                        "name": row.name,
+                        "parent_id": row.parent_id,
+                    }
+                    children.setdefault(row.parent_id, set()).add(row.id)
+                self.categories, self.children = categories, children
+                self.loaded_at, self.version = time.monotonic(), version
+                metrics.increment("categories.tree_loads")
+                metrics.set_gauge("categories.tree_size", len(categories))
+        return self
+
+    def children_of(self, parent_id: int | None) -> list[dict]:
+        return [
+            self.categories[category_id]
+            for category_id in sorted(self.children.get(parent_id, ()))
+        ]
+
+
+category_tree = CategoryTree(ttl=CATEGORY_TREE_TTL)
+
+
+async def get_parent_categories(db: AsyncSession) -> list[dict]:
+    return (await category_tree.load(db)).children_of(None)
+
+
+async def get_subcategories(parent_id: int, db: AsyncSession) -> list[dict]:
+    return (await category_tree.load(db)).children_of(parent_id)
+
+
+async def validate_category(
+    category_id: int, subcategory_id: int | None, db: AsyncSession
+):
+    """Raises 400 unless category_id is a parent category and subcategory_id,
+    if given, one of its subcategories."""
+    tree = await category_tree.load(db)
+
+    # Checking if the category exists
+    if category_id not in tree.children[None]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Category not found"
+        )
+
+    # Checking if the subcategory exists
+    if subcategory_id and subcategory_id not in tree.children.get(category_id, ()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Subcategory not found"
+        )
@@ -0,0 +1,223 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+from uuid import uuid4
+
+from fastapi import UploadFile
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core import metrics
+from core.images import VARIANTS, remove_variants, variant_path
+from core.logger import televito_logger
+from core.utils import image_extension, stream_upload
+from db.models import ImageBlobModel
+
+# Content-addressed image store: every distinct image is kept once, at
+# STORE_DIR/ab/cd/abcd...<sha256>.<ext>, and image_blobs counts its references.
+STORE_DIR = "./app/content/images"
+TMP_DIR = os.path.join(STORE_DIR, "tmp")
+# images saved before the store are deleted directly when released
+LEGACY_DIRS = ("./app/content/post_images", "./app/content/profile_photos")
+
+# (temporary path, sha256, size, extension) of an upload not yet in the store
+StagedImage = tuple[str, str, int, str]
+
+
+def blob_path(sha256: str, extension: str, root: str = STORE_DIR) -> str:
+    return os.path.join(root, sha256[:2], sha256[2:4], f"{sha256}.{extension}")
+
+
+# session.info key of the legacy files released in the current transaction
+RELEASED_LEGACY_FILES = "released_legacy_files"
+
+
+def blob_sha256(path: str) -> str:
+    return os.path.basename(path).split(".")[0]
+
+
+def remove_blob_files(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+    remove_variants({name: variant_path(path, name) for name in VARIANTS})
+
+
+async def stage_image(image: UploadFile, max_size: int | None = None) -> StagedImage:
+    """Streams an upload to a temporary file, hashing it on the way."""
+    extension = image_extension(image)
+    await asyncio.to_thread(os.makedirs, TMP_DIR, exist_ok=True)
+    temp_path = os.path.join(TMP_DIR, f"{uuid4()}.{extension}")
+    sha256, size = await stream_upload(image, temp_path, max_size)
+    return temp_path, sha256, size, extension
+
+
+async def discard_staged(staged: list[StagedImage]):
+    for temp_path, *_ in staged:
+        if os.path.exists(temp_path):
+            await asyncio.to_thread(os.remove, temp_path)
+
+
+async def store_staged_image(staged: StagedImage, db: AsyncSession) -> str:
+    """Adds a reference to the blob of a staged upload and returns its path.
+
+    The blob row is upserted before the file is moved into place. The row
+    stays locked until the caller commits, so the garbage collector cannot
+    delete the file in between. Known content is not written again.
+    """
+    temp_path, sha256, size, extension = staged
+    query = insert(ImageBlobModel).values(
+        sha256=sha256, path=blob_path(sha256, extension), size=size, refcount=1
+    )
+    query = query.on_conflict_do_update(
+        index_elements=[ImageBlobModel.sha256],
+        set_={"refcount": ImageBlobModel.refcount + 1, "updated_at": func.now()},
+    ).returning(ImageBlobModel.path)
+    path = (await db.execute(query)).scalar()
+
+    if await asyncio.to_thread(os.path.exists, path):
+        await asyncio.to_thread(os.remove, temp_path)
+        metrics.increment("images.deduplicated")
+        metrics.increment("images.deduplicated_bytes", size)
+    else:
+        await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+        await asyncio.to_thread(os.replace, temp_path, path)
+        metrics.increment("images.stored_bytes", size)
+    return path
+
+
+async def save_image(
+    image: UploadFile, db: AsyncSession, max_size: int | None = None
+) -> str:
+    """Stores an upload by content and references it once, the caller commits."""
+    staged = await stage_image(image, max_size)
+    try:
+        return await store_staged_image(staged, db)
+    finally:
+        await discard_staged([staged])
+
+
+async def release_images(paths: list[str], db: AsyncSession):
+    """Drops one reference per path, the caller commits.
+
+    Blobs are not deleted here, collect_image_garbage removes them once they
+    stayed unreferenced for a while. Files saved before the store have no
+    blob and are removed when the transaction commits.
+    """
+    for path, count in Counter(path for path in paths if path).items():
+        result = await db.execute(
+            update(ImageBlobModel)
+            .where(ImageBlobModel.sha256 == blob_sha256(path))
+            .values(refcount=ImageBlobModel.refcount - count)
+        )
+        if result.rowcount == 0 and path.startswith(LEGACY_DIRS):
+            db.info.setdefault(RELEASED_LEGACY_FILES, []).append(path)
+
+
+@event.listens_for(Session, "after_commit")
+def remove_released_legacy_files(session: Session):
+    """Legacy files go once their release is committed, never on a rollback."""
+    for path in session.info.pop(RELEASED_LEGACY_FILES, []):
+        remove_blob_files(path)
+
+
+@event.listens_for(Session, "after_rollback")
+def keep_released_legacy_files(session: Session):
+    session.info.pop(RELEASED_LEGACY_FILES, None)
+
+
+def list_stale_files(cutoff: float) -> tuple[dict[str, str], list[str]]:
+    """Store files older than cutoff: {sha256: blob path} and temporary files."""
+    blobs, temps = {}, []
+    for root, _, files in os.walk(STORE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.getmtime(path) >= cutoff:
+                continue
+            if os.path.samefile(root, TMP_DIR):
+                temps.append(path)
+            elif "_" not in name:  # variants are removed with their blob
+                blobs[name.split(".")[0]] = path
+    return blobs, temps
+
+
+async def remove_orphan(sha256: str, path: str, db: AsyncSession) -> bool:
+    """Removes a stored file without a blob row, returns whether it did.
+
+    An upload of the same content may have inserted the row without
+    committing yet, which a SELECT cannot see. Inserting a placeholder row
+    waits for that upload and conflicts if it committed; once inserted, the
+    placeholder holds back new uploads of the content until the file is gone.
+    """
+    result = await db.execute(
+        insert(ImageBlobModel)
+        .values(sha256=sha256, path=path, size=0, refcount=0)
+        .on_conflict_do_nothing()
+        .returning(ImageBlobModel.sha256)
+    )
+    if result.scalar() is None:
+        await db.commit()
+        return False
+    await asyncio.to_thread(remove_blob_files, path)
+    await db.execute(delete(ImageBlobModel).where(ImageBlobModel.sha256 == sha256))
+    await db.commit()
+    return True
+
+
+async def collect_image_garbage(
+    db: AsyncSession, grace: timedelta, batch_size: int = 500
+) -> int:
+    """Deletes blobs unreferenced for longer than grace, returns their number.
+
+    Also removes files without a blob row, left by uploads whose request
+    failed, and stale temporary files.
+    """
+    deleted = 0
+    while True:
+        result = await db.execute(
+            select(ImageBlobModel)
+            .where(
+                ImageBlobModel.refcount <= 0,
+                ImageBlobModel.updated_at < func.now() - grace,
+            )
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        blobs = result.scalars().all()
+        # files go first: an upload of the same content waits on the row lock
+        # and writes the file again once the row is gone
+        for blob in blobs:
+            await asyncio.to_thread(remove_blob_files, blob.path)
+            await db.delete(blob)
+        await db.commit()
+        deleted += len(blobs)
+        if len(blobs) < batch_size:
+            break
+
+    if not os.path.isdir(STORE_DIR):
+        return deleted
+    cutoff = time.time() - grace.total_seconds()
+    files, temps = await asyncio.to_thread(list_stale_files, cutoff)
+    orphans = 0
+    hashes = list(files)
+    for start in range(0, len(hashes), 1000):
+        chunk = hashes[start : start + 1000]
+        result = await db.execute(
+            select(ImageBlobModel.sha256).where(ImageBlobModel.sha256.in_(chunk))
+        )
+        known = set(result.scalars().all())
+        for sha256 in chunk:
+            if sha256 not in known and await remove_orphan(sha256, files[sha256], db):
+                orphans += 1
+    for path in temps:
+        await asyncio.to_thread(os.remove, path)
+
+    metrics.increment("images.gc_deleted", deleted + orphans)
+    televito_logger.info(
+        f"IMAGE GC: DELETED {deleted} UNREFERENCED BLOBS, {orphans} ORPHAN FILES "
+        f"AND {len(temps)} TEMPORARY FILES"
+    )
+    return deleted + orphans
@@ -1,70 +1,65 @@
-import os
+import asyncio
 from fastapi import HTTPException, UploadFile, status
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.utils import save_image
-from db.models import PostModel, CategoryModel
+from core.images import make_variants
+from db.connection import SessionLocal
+from db.models import PostModel, UserModel
 from schemas import PostCreate, PostUpdate
-from services.user_service import get_user
-from routes.category_route import get_parent_categories, get_subcategories
+from services.category_service import validate_category
+from services.image_service import (
+    discard_staged,
+    release_images,
+    stage_image,
+    store_staged_image,
+)
 
-IMAGES_DIR = "./app/content/post_images"
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5mb in bytes
 
 
-def download_post_images(images: list[UploadFile], dir: str) -> tuple[str, str]:
-    # Downloading images to the server
-    images_paths = []
+async def download_post_images(
+    images: list[UploadFile], db: AsyncSession
+) -> tuple[list[str], list[str]]:
+    """Saves the images of a post, too large ones are skipped.
+
+    Uploads are streamed to disk concurrently, then stored in the image store
+    one by one since they share the session. The caller commits.
+    """
+    results = await asyncio.gather(
+        *(stage_image(image=image, max_size=MAX_IMAGE_SIZE) for image in images),
+        return_exceptions=True,
+    )
+
+    staged = []
     large_images = []
-    for image in images:
-        if image.size > MAX_IMAGE_SIZE:
+    error = None
+    for image, result in zip(images, results):
+        if isinstance(result, HTTPException) and result.status_code == 413:
             large_images.append(image.filename)
+        elif isinstance(result, BaseException):
+            error = error or result
         else:
-            images_paths.append(save_image(image=image, dir=dir))
+            staged.append(result)
+
+    try:
+        # a rejected image fails the whole request, do not leave the others behind
+        if error:
+            raise error
+        images_paths = [await store_staged_image(image, db) for image in staged]
+    finally:
+        await discard_staged(staged)
 
     return images_paths, large_images
 
 
 async def create_post_logic(
-    post_schema: PostCreate, username: str, db: AsyncSession
+    post_schema: PostCreate, user: UserModel, db: AsyncSession
 ) -> tuple[PostModel, list[str] | None]:
-    user = await get_user(username=username, db=db)
-
-    query = select(func.max(PostModel.id))
-    result = await db.execute(query)
-    last_post_id = result.scalar()
-    if not last_post_id:
-        next_post_id = 1
-    else:
-        next_post_id = last_post_id + 1
-
-    post_dir = os.path.join(IMAGES_DIR, f"user{str(user.id)}", f"post{next_post_id}")
-    if not os.path.exists(post_dir):
-        os.makedirs(post_dir, exist_ok=True)
-
-    images_paths, large_images = download_post_images(post_schema.images, dir=post_dir)
-
-    # Checking if the category exists
-    if post_schema.category_id not in [
-        available_categories.id
-        for available_categories in await get_parent_categories(db=db)
-    ]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Category not found"
-        )
+    # Checked before the images are stored, a rejected post costs no upload
+    await validate_category(post_schema.category_id, post_schema.subcategory_id, db)
 
-    # Checking if the subcategory exists
-    if post_schema.subcategory_id:
-        if post_schema.subcategory_id not in [
-            available_subcategories.id
-            for available_subcategories in await get_subcategories(
-                parent_id=post_schema.category_id, db=db
-            )
-        ]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail="Subcategory not found"
-            )
+    images_paths, large_images = await download_post_images(post_schema.images, db=db)
 
     post_schema.images = images_paths
     post = PostModel(**post_schema.model_dump(), author_id=user.id)
@@ -76,9 +71,7 @@ async def create_post_logic(
     return post, large_images
 
 
-async def get_posts_list(username: str, db: AsyncSession) -> list[PostModel] | None:
-    user = await get_user(username=username, db=db)
-
+async def get_posts_list(user: UserModel, db: AsyncSession) -> list[PostModel] | None:
     query = select(PostModel).filter(PostModel.author_id == user.id)
     result = await db.execute(query)
     posts = result.scalars().all()
@@ -96,10 +89,8 @@ async def get_post(post_id: int, db: AsyncSession) -> PostModel | None:
 
 
 async def update_post_logic(
-    post_id: int, username: str, update_data: PostUpdate, db: AsyncSession
+    post_id: int, user: UserModel, update_data: PostUpdate, db: AsyncSession
 ) -> tuple[PostModel, list[str] | None]:
-    user = await get_user(username=username, db=db)
-
     query = select(PostModel).filter(PostModel.id == post_id)
     result = await db.execute(query)
     post = result.scalar()
@@ -110,23 +101,36 @@ async def update_post_logic(
     if user.id != post.author_id:
         raise HTTPException(status_code=403, detail="Forbidden")
 
+    # Indexes refer to the images before this update, all are removed at once
+    images = post.images or []
+    indexes_to_delete = set(update_data.images_indexes_to_delete or [])
+    if any(not 0 <= index < len(images) for index in indexes_to_delete):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image index"
+        )
+
     # Updating post images if they were changed
 
     large_images = []
     images_paths = []
     if update_data.images:
-        images_paths, large_images = download_post_images(
-            update_data.images,
-            dir=os.path.join(IMAGES_DIR, f"user{str(user.id)}", f"post{post_id}"),
+        images_paths, large_images = await download_post_images(
+            update_data.images, db=db
         )
 
-    # Deleting images from the server if they were deleted in update data
-    if update_data.images_indexes_to_delete:
-        for image in update_data.images_indexes_to_delete:
-            os.remove(post.images[image])
-            del post.images[image]
+    # Dropping the references of deleted images, the image store removes the
+    # files once no post or profile uses them
+    if indexes_to_delete:
+        removed = [path for index, path in enumerate(images) if index in indexes_to_delete]
+        images = [path for index, path in enumerate(images) if index not in indexes_to_delete]
+        await release_images(removed, db)
+        post.image_variants = {
+            path: variants
+            for path, variants in (post.image_variants or {}).items()
+            if path in images
+        }
 
-    update_data.images = post.images + images_paths
+    update_data.images = images + images_paths
 
     # Updating post data
     for key, value in update_data.model_dump(
@@ -138,3 +142,35 @@ async def update_post_logic(
     await db.refresh(post)
 
     return post, large_images
+
+
+async def process_post_images(post_id: int):
+    """Background task, renders the variants of the post images that have none.
+
+    Runs after the response is sent with its own sessions. Images removed
+    from the post in the meantime are skipped.
+    """
+    async with SessionLocal() as db:
+        post = await get_post(post_id, db)
+        if not post:
+            return
+        done = post.image_variants or {}
+        pending = [path for path in post.images or [] if path not in done]
+    if not pending:
+        return
+
+    rendered = await asyncio.gather(*(make_variants(path) for path in pending))
+
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(PostModel).where(PostModel.id == post_id).with_for_update()
+        )
+        post = result.scalar()
+        variants = dict(post.image_variants or {}) if post else {}
+        # variants belong to the stored blob, shared by every post using it
+        for path, paths in zip(pending, rendered):
+            if post and paths and path in post.images:
+                variants[path] = paths
+        if post:
+            post.image_variants = variants
+            await db.commit()
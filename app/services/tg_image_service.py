@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import os
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import delete, distinct, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import metrics
+from core.config import TG_IMAGE_MAX_FAILURES
+from core.images import make_variants
+from core.logger import televito_logger
+from db.models import TGImageModel
+from services.image_service import blob_path, remove_blob_files
+
+# Photos of tg_posts, stored once by content like uploads but in their own
+# directory: image_service's garbage collector only knows image_blobs. Their
+# variants are rendered next to them for the listings.
+TG_IMAGES_DIR = "./app/content/tg_images"
+
+# the mirror and the eviction both run in the ingestion worker, a file is not
+# written while eviction decides whether it can go
+store_lock = asyncio.Lock()
+# newest last_used_at the quota evicted in the last eviction run; the mirror
+# leaves older photos alone until a run finds room for them again
+evicted_before: datetime | None = None
+
+
+def tg_image_path(sha256: str) -> str:
+    return blob_path(sha256, "jpg", root=TG_IMAGES_DIR)
+
+
+def write_tg_image(data: bytes) -> tuple[str, int]:
+    """Writes a downloaded photo under its sha256 unless already there."""
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = tg_image_path(sha256)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid4()}.tmp"
+        with open(temp_path, "wb") as buffer:
+            buffer.write(data)
+        os.replace(temp_path, path)
+    return sha256, len(data)
+
+
+async def register_tg_images(posts: list, db: AsyncSession):
+    """Queues the photos of written posts for the mirror, the caller commits.
+
+    posts are rows with images and publication_datetime. A photo already
+    known only moves its last_used_at forward.
+    """
+    last_used = {}
+    for post in posts:
+        for file_id in post.images or []:
+            if file_id not in last_used or last_used[file_id] < post.publication_datetime:
+                last_used[file_id] = post.publication_datetime
+    if not last_used:
+        return
+
+    query = insert(TGImageModel).values(
+        [
+            {"file_id": file_id, "last_used_at": used_at, "failures": 0}
+            for file_id, used_at in last_used.items()
+        ]
+    )
+    query = query.on_conflict_do_update(
+        index_elements=[TGImageModel.file_id],
+        set_={"last_used_at": query.excluded.last_used_at},
+        where=query.excluded.last_used_at > TGImageModel.last_used_at,
+    )
+    await db.execute(query)
+
+
+async def pending_tg_images(db: AsyncSession, limit: int) -> list[str]:
+    """file_ids still to download, the most recently posted first."""
+    query = select(TGImageModel.file_id).where(
+        TGImageModel.sha256.is_(None),
+        TGImageModel.failures < TG_IMAGE_MAX_FAILURES,
+    )
+    if evicted_before:
+        query = query.where(TGImageModel.last_used_at > evicted_before)
+    result = await db.execute(
+        query.order_by(TGImageModel.last_used_at.desc()).limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def store_tg_images(downloads: dict[str, bytes | None], db: AsyncSession):
+    """Stores downloaded photos by file_id and commits, None is a failed download.
+
+    Photos evicted or stored since pending_tg_images listed them are dropped,
+    their file would belong to no row.
+    """
+    stored = []
+    async with store_lock:
+        for file_id, data in downloads.items():
+            pending = await db.execute(
+                select(TGImageModel.file_id)
+                .where(TGImageModel.file_id == file_id, TGImageModel.sha256.is_(None))
+                .with_for_update()
+            )
+            if pending.scalar() is None:
+                continue
+            if data is None:
+                values = {"failures": TGImageModel.failures + 1}
+            else:
+                sha256, size = await asyncio.to_thread(write_tg_image, data)
+                await make_variants(tg_image_path(sha256))
+                values = {"sha256": sha256, "size": size}
+                stored.append(size)
+            await db.execute(
+                update(TGImageModel).where(TGImageModel.file_id == file_id).values(**values)
+            )
+        await db.commit()
+    metrics.increment("tg_images.downloaded", len(stored))
+    metrics.increment("tg_images.downloaded_bytes", sum(stored))
+
+
+async def get_tg_image(file_id: str, db: AsyncSession) -> TGImageModel | None:
+    """The mirrored photo of a file_id, None if it is not downloaded (yet)."""
+    result = await db.execute(
+        select(TGImageModel).where(
+            TGImageModel.file_id == file_id, TGImageModel.sha256.is_not(None)
+        )
+    )
+    return result.scalar()
+
+
+async def stored_tg_images_size(db: AsyncSession) -> int:
+    """Bytes on disk, a photo shared by several file_ids counts once."""
+    files = (
+        select(distinct(TGImageModel.sha256), TGImageModel.size)
+        .where(TGImageModel.sha256.is_not(None))
+        .subquery()
+    )
+    return (await db.execute(select(func.coalesce(func.sum(files.c.size), 0)))).scalar()
+
+
+async def delete_tg_images(file_ids, db: AsyncSession) -> tuple[int, int]:
+    """Deletes the rows and then the files no other row uses, commits.
+
+    Returns the number of removed files and their bytes.
+    """
+    result = await db.execute(
+        delete(TGImageModel)
+        .where(TGImageModel.file_id.in_(file_ids))
+        .returning(TGImageModel.sha256, TGImageModel.size)
+    )
+    return await remove_unused_files(
+        {row.sha256: row.size for row in result.all() if row.sha256}, db
+    )
+
+
+async def evict_tg_image_files(file_ids, db: AsyncSession) -> tuple[int, int]:
+    """Like delete_tg_images, but the rows stay as pending downloads."""
+    result = await db.execute(
+        select(TGImageModel.sha256, TGImageModel.size).where(
+            TGImageModel.file_id.in_(file_ids), TGImageModel.sha256.is_not(None)
+        )
+    )
+    sizes = {row.sha256: row.size for row in result.all()}
+    await db.execute(
+        update(TGImageModel)
+        .where(TGImageModel.file_id.in_(file_ids))
+        .values(sha256=None, size=None, failures=0)
+    )
+    return await remove_unused_files(sizes, db)
+
+
+async def remove_unused_files(sizes: dict[str, int], db: AsyncSession) -> tuple[int, int]:
+    """Commits, then removes the files of sizes ({sha256: size}) no row uses."""
+    still_used = set()
+    if sizes:
+        result = await db.execute(
+            select(distinct(TGImageModel.sha256)).where(TGImageModel.sha256.in_(sizes))
+        )
+        still_used = set(result.scalars().all())
+    await db.commit()
+
+    removed = [sha256 for sha256 in sizes if sha256 not in still_used]
+    for sha256 in removed:
+        await asyncio.to_thread(remove_blob_files, tg_image_path(sha256))
+    return len(removed), sum(sizes[sha256] for sha256 in removed)
+
+
+async def evict_tg_images(
+    cutoff: datetime, quota_bytes: int, db: AsyncSession, batch_size: int = 500
+) -> int:
+    """Evicts photos last posted before cutoff, then the least recently posted
+    ones until the mirror fits in quota_bytes. Returns the number of removed files.
+
+    Photos of expired posts lose their rows. Over the quota only the files
+    go, the rows of posts still listed stay and are downloaded again once
+    there is room.
+    """
+    global evicted_before
+    evicted = 0
+    async with store_lock:
+        while True:
+            expired = (
+                select(TGImageModel.file_id)
+                .where(TGImageModel.last_used_at < cutoff)
+                .limit(batch_size)
+            )
+            file_ids = list((await db.execute(expired)).scalars().all())
+            if file_ids:
+                removed, _ = await delete_tg_images(file_ids, db)
+                evicted += removed
+            if len(file_ids) < batch_size:
+                break
+
+        total = await stored_tg_images_size(db)
+        evicted_before = None
+        while total > quota_bytes:
+            oldest = (
+                select(TGImageModel.file_id, TGImageModel.last_used_at)
+                .where(TGImageModel.sha256.is_not(None))
+                .order_by(TGImageModel.last_used_at)
+                .limit(batch_size)
+            )
+            rows = (await db.execute(oldest)).all()
+            if not rows:
+                break
+            removed, freed = await evict_tg_image_files([row.file_id for row in rows], db)
+            evicted += removed
+            total -= freed
+            evicted_before = rows[-1].last_used_at
+
+    metrics.increment("tg_images.evicted", evicted)
+    metrics.set_gauge("tg_images.bytes", total)
+    televito_logger.info(
+        f"TG IMAGES: EVICTED {evicted} PHOTOS, {total / 2**20:.1f} MB STORED"
+    )
+    return evicted
@@ -1,11 +1,37 @@
-from sqlalchemy import desc, asc, func, select, between
+import base64
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException, status as http_status
+from sqlalchemy import (
+    Select,
+    and_,
+    asc,
+    between,
+    delete,
+    desc,
+    func,
+    or_,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import date
 
+from core import metrics
+from core.cache import TTLCache, bump_version, get_version
+from core.config import TG_POSTS_COUNT_CACHE_TTL, TG_POSTS_COUNT_CAP
+from core.logger import televito_logger
+from core.response_cache import response_cache
 from db.models import TGPostModel
+from services.version_service import bump_data_version
 
+# Exact counts per filter set, keyed with the tg_posts data version the parser bumps
+count_cache = TTLCache(maxsize=1024, ttl=TG_POSTS_COUNT_CACHE_TTL)
 
-async def get_filtered_tg_posts(
+
+def build_tg_posts_query(
     status: str | None,
     price: str | None,
     duration: str | None,
@@ -14,12 +40,7 @@ async def get_filtered_tg_posts(
     area: str | None,
     floor: str | None,
     pets_allowed: bool | None,
-    sort_by: str | None,
-    sort_order: bool | None,
-    page_num: int | None,
-    limit: int | None,
-    db: AsyncSession,
-) -> tuple[int, list[TGPostModel]]:
+) -> Select:
     query = select(TGPostModel)
 
     # Status filter
@@ -52,7 +73,9 @@ async def get_filtered_tg_posts(
             between(TGPostModel.rooms, int(rooms_bottom), int(rooms_top))
         )
     elif rooms is not None:
-        query = query.between(TGPostModel.rooms, float(rooms), float(rooms) + 0.5)
+        query = query.where(
+            between(TGPostModel.rooms, float(rooms), float(rooms) + 0.5)
+        )
     # Area filter
     if area is not None and "-" in area:
         area_bottom, area_top = area.split("-")
@@ -73,23 +96,259 @@ async def get_filtered_tg_posts(
     # Pets_allowed filter
     if pets_allowed is not None:
         query = query.where(TGPostModel.pets_allowed == pets_allowed)
-    # Sort_order filter
-    if sort_order is None:
-        sort_order = False
-    # Sort_by filter
+
+    return query
+
+
+def get_sort_column(sort_by: str | None):
     if sort_by is not None:
         sort_by = getattr(TGPostModel, sort_by, None)
     if sort_by is None:
         sort_by = getattr(TGPostModel, "publication_datetime", None)
+    return sort_by
 
-    # Get total count of posts
-    query = query.order_by(asc(sort_by) if sort_order else desc(sort_by))
+
+def count_cache_key(**filters) -> tuple:
+    """Normalized filter set: unset filters dropped, "today" resolved to a date."""
+    if filters.get("status") == "today":
+        filters["status"] = date.today().isoformat()
+    return (get_version("tg_posts"),) + tuple(
+        sorted((key, value) for key, value in filters.items() if value is not None)
+    )
+
+
+async def count_tg_posts(
+    query: Select, cache_key: tuple, mode: str, db: AsyncSession
+) -> tuple[int | None, str]:
+    """Counts the filtered posts according to mode.
+
+    Returns the total and the mode that actually produced it: "exact",
+    "cached", "capped" (the cap was reached, there are at least that many),
+    "estimated" (planner estimate) or "none" (not counted).
+    """
+    if mode == "none":
+        return None, "none"
+
+    if mode == "estimated":
+        sql = query.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+        result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"]), "estimated"
+
+    if mode == "capped":
+        result = await db.execute(
+            select(func.count()).select_from(
+                query.limit(TG_POSTS_COUNT_CAP).subquery()
+            )
+        )
+        total = result.scalar()
+        return total, "capped" if total >= TG_POSTS_COUNT_CAP else "exact"
+
+    total = count_cache.get(cache_key)
+    if total is not None:
+        return total, "cached"
     result = await db.execute(select(func.count()).select_from(query.subquery()))
     total = result.scalar()
+    count_cache.set(cache_key, total)
+    return total, "exact"
 
-    # Get items
-    query = query.offset((page_num - 1) * limit).limit(limit)
+
+async def get_filtered_tg_posts(
+    status: str | None,
+    price: str | None,
+    duration: str | None,
+    is_new: bool | None,
+    rooms: str | None,
+    area: str | None,
+    floor: str | None,
+    pets_allowed: bool | None,
+    sort_by: str | None,
+    sort_order: bool | None,
+    page_num: int | None,
+    limit: int | None,
+    db: AsyncSession,
+    count: str = "exact",
+) -> tuple[int | None, str, bool, list[TGPostModel]]:
+    """Returns (total, total_mode, has_next, posts) for one OFFSET page."""
+    query = build_tg_posts_query(
+        status, price, duration, is_new, rooms, area, floor, pets_allowed
+    )
+    sort_by = get_sort_column(sort_by)
+
+    # Get total count of posts, the count does not need the ordering
+    total, total_mode = await count_tg_posts(
+        query,
+        count_cache_key(
+            status=status,
+            price=price,
+            duration=duration,
+            is_new=is_new,
+            rooms=rooms,
+            area=area,
+            floor=floor,
+            pets_allowed=pets_allowed,
+        ),
+        count,
+        db,
+    )
+
+    # Get items, one extra row tells whether there is a next page
+    query = query.order_by(asc(sort_by) if sort_order else desc(sort_by))
+    query = query.offset((page_num - 1) * limit).limit(limit + 1)
     result = await db.execute(query)
     posts = result.scalars().all()
 
-    return (total, posts)
+    return (total, total_mode, len(posts) > limit, posts[:limit])
+
+
+# Keyset pagination
+
+
+def encode_cursor(post: TGPostModel, sort_by: str, direction: str) -> str:
+    """Opaque cursor holding the sort key and id of the post at a page edge."""
+    value = getattr(post, sort_by)
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    payload = json.dumps({"v": value, "id": post.id, "d": direction})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_column) -> tuple[object, int, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        value, post_id, direction = payload["v"], int(payload["id"]), payload["d"]
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        if value is not None:
+            python_type = sort_column.type.python_type
+            if python_type in (date, datetime):
+                value = python_type.fromisoformat(value)
+            else:
+                value = python_type(value)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return value, post_id, direction
+
+
+def keyset_predicate(sort_column, value, post_id: int, ascending: bool, after: bool):
+    """Rows strictly after (or before) (value, post_id) in the keyset order.
+
+    The order is (sort_column, id), both ascending or both descending. NULL
+    sort keys rank above every value, like PostgreSQL's default NULLS LAST
+    for ASC / NULLS FIRST for DESC, so a plain (sort_column, id) btree index
+    serves both directions; nullable sort columns need their own branches.
+    """
+    key = tuple_(sort_column, TGPostModel.id)
+    bound = tuple_(value, post_id)
+    if ascending == after:
+        # keys greater than the bound
+        if value is None:
+            return and_(sort_column.is_(None), TGPostModel.id > post_id)
+        return or_(key > bound, sort_column.is_(None))
+    # keys less than the bound
+    if value is None:
+        return or_(sort_column.is_not(None), TGPostModel.id < post_id)
+    return and_(sort_column.is_not(None), key < bound)
+
+
+def keyset_order(sort_column, ascending: bool, reverse: bool = False):
+    if ascending != reverse:
+        return asc(sort_column), asc(TGPostModel.id)
+    return desc(sort_column), desc(TGPostModel.id)
+
+
+async def get_tg_posts_page_by_cursor(
+    query: Select,
+    sort_by: str | None,
+    sort_order: bool | None,
+    cursor: str | None,
+    limit: int,
+    db: AsyncSession,
+) -> tuple[list[TGPostModel], str | None, str | None]:
+    """Fetches one page with a seek on (sort_by, id) instead of OFFSET.
+
+    Returns the posts and the cursors of the next and previous pages.
+    """
+    sort_column = get_sort_column(sort_by)
+    sort_name = sort_column.key
+    ascending = bool(sort_order)
+
+    direction = "next"
+    if cursor:
+        value, post_id, direction = decode_cursor(cursor, sort_column)
+        query = query.where(
+            keyset_predicate(
+                sort_column, value, post_id, ascending, after=direction == "next"
+            )
+        )
+
+    # walk backwards for the previous page, fetch one extra row to see if there is more
+    reverse = direction == "prev"
+    query = query.order_by(*keyset_order(sort_column, ascending, reverse))
+    result = await db.execute(query.limit(limit + 1))
+    posts = list(result.scalars().all())
+    has_more = len(posts) > limit
+    posts = posts[:limit]
+    if reverse:
+        posts.reverse()
+
+    if not posts:
+        return posts, None, None
+
+    if reverse:
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, cursor is not None
+    next_cursor = encode_cursor(posts[-1], sort_name, "next") if has_next else None
+    prev_cursor = encode_cursor(posts[0], sort_name, "prev") if has_prev else None
+
+    return posts, next_cursor, prev_cursor
+
+
+# Retention
+
+
+async def purge_expired_tg_posts(
+    cutoff: datetime, batch_size: int, db: AsyncSession
+) -> int:
+    """Deletes posts published before cutoff, batch_size rows per transaction.
+
+    Short batches keep locks and WAL bursts small while the API keeps reading.
+    Every batch bumps the tg_posts data version with its delete, so the
+    batches committed before a failure are invalidated too. Returns the
+    number of deleted rows.
+    """
+    deleted = 0
+    try:
+        while True:
+            expired_ids = (
+                select(TGPostModel.id)
+                .where(TGPostModel.publication_datetime < cutoff)
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                delete(TGPostModel)
+                .where(TGPostModel.id.in_(expired_ids))
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                await bump_data_version("tg_posts", db)
+            await db.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                break
+    finally:
+        if deleted:
+            await response_cache.bump("tg_posts")
+            bump_version("tg_posts_purge")  # the parse cache may point at deleted rows
+        metrics.increment("retention.rows_deleted", deleted)
+    televito_logger.info(f"RETENTION: DELETED {deleted} POSTS OLDER THAN {cutoff}")
+    return deleted
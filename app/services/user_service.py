@@ -1,18 +1,23 @@
-import os
 import re
 
-from fastapi import HTTPException, status
-from sqlalchemy import delete, select
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.security import (
     create_access_token,
+    decode_access_token,
     hash_password,
+    oauth2_scheme,
     verify_password,
 )
-from db.models import UserModel
+from db.connection import SessionLocal, get_db
+from db.models import PostModel, UserModel
+from db.models.user_model import normalize_phone
 from schemas import UserChangePassword, UserCreate, UserUpdate
-from core.utils import save_image
+from core.images import make_variants
+from services.image_service import release_images, save_image
 
 
 async def get_user(
@@ -20,18 +25,25 @@ async def get_user(
     user_id: int | None = None,
     username: str | None = None,
     email: str | None = None,
-    phone: int | None = None,
+    phone: str | None = None,
 ) -> UserModel:
+    # the predicates match the uq_users_* expression indexes
     if user_id:
         result = await db.execute(select(UserModel).where(UserModel.id == user_id))
     elif username:
         result = await db.execute(
-            select(UserModel).where(UserModel.username == username)
+            select(UserModel).where(func.lower(UserModel.username) == username.lower())
         )
     elif email:
-        result = await db.execute(select(UserModel).where(UserModel.email == email))
+        result = await db.execute(
+            select(UserModel).where(func.lower(UserModel.email) == email.lower())
+        )
     elif phone:
-        result = await db.execute(select(UserModel).where(UserModel.phone == phone))
+        result = await db.execute(
+            select(UserModel).where(
+                UserModel.phone_normalized == normalize_phone(str(phone))
+            )
+        )
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -43,6 +55,45 @@ async def get_user(
     return user
 
 
+async def get_current_user(
+    request: Request,
+    token: str | None = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db),
+) -> UserModel:
+    """Auth dependency, the bearer token or the access_token cookie's user.
+
+    FastAPI resolves it once per request. Tokens carry the user id, older
+    ones without it fall back to the username.
+    """
+    if not token:
+        token = request.cookies.get("access_token")
+
+    principal = decode_access_token(token)
+    if principal.get("uid"):
+        user = await get_user(user_id=principal["uid"], db=db)
+    else:
+        user = await get_user(username=principal["sub"], db=db)
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
+        )
+
+    return user
+
+
+async def commit_credentials(db: AsyncSession):
+    """Commits a new or changed user, a taken username, email or phone is a 400."""
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username, email or phone already exists",
+        )
+
+
 async def create_user_logic(user_schema: UserCreate, db: AsyncSession) -> UserModel:
     if await get_user(username=user_schema.username, db=db):
         raise HTTPException(
@@ -53,11 +104,11 @@ async def create_user_logic(user_schema: UserCreate, db: AsyncSession) -> UserMo
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already exists"
         )
 
-    user_schema.password = hash_password(user_schema.password)
+    user_schema.password = await hash_password(user_schema.password)
     user = UserModel(**user_schema.model_dump())
 
     db.add(user)
-    await db.commit()
+    await commit_credentials(db)
     await db.refresh(user)
 
     return user
@@ -71,47 +122,32 @@ async def authenticate_user(db: AsyncSession, credentials: str, password: str):
     else:
         user = await get_user(db=db, username=credentials)
 
-    if not user or not verify_password(password, user.password):
+    if not user or not await verify_password(password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
         )
 
-    access_token = create_access_token(username=user.username)
+    access_token = create_access_token(username=user.username, user_id=user.id)
 
     return access_token
 
 
-PHOTOS_DIR = "./app/content/profile_photos"
 MAX_PHOTO_SIZE = 1024 * 1024  # 1 mb in bytes
 
 
 async def update_user_logic(
-    username: str,
+    user: UserModel,
     update_data: UserUpdate,
     db: AsyncSession,
 ) -> UserModel:
-    user = await get_user(username=username, db=db)
-
-    user_dir = os.path.join(PHOTOS_DIR, f"user{str(user.id)}")
-
-    if not os.path.exists(user_dir):
-        os.makedirs(user_dir, exist_ok=True)
-
     # Updating profile photo if it was changed
     if update_data.profile_photo:
-        if update_data.profile_photo.size > MAX_PHOTO_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="Profile photo is too large",
-            )
-
-        update_data.profile_photo = save_image(
-            image=update_data.profile_photo,
-            dir=os.path.join(PHOTOS_DIR, f"user{str(user.id)}"),
+        update_data.profile_photo = await save_image(
+            image=update_data.profile_photo, db=db, max_size=MAX_PHOTO_SIZE
         )
 
-        if os.path.exists(user.profile_photo):
-            os.remove(user.profile_photo)
+        await release_images([user.profile_photo], db)
+        user.profile_photo_variants = None
 
     # Updating user data
     for key, value in update_data.model_dump(
@@ -119,23 +155,21 @@ async def update_user_logic(
     ).items():
         setattr(user, key, value)
 
-    await db.commit()
+    await commit_credentials(db)
     await db.refresh(user)
 
     return user
 
 
 async def change_user_password_logic(
-    username: str, password_schema: UserChangePassword, db: AsyncSession
+    user: UserModel, password_schema: UserChangePassword, db: AsyncSession
 ) -> UserModel:
-    user = await get_user(username=username, db=db)
-
-    if not verify_password(password_schema.old_password, user.password):
+    if not await verify_password(password_schema.old_password, user.password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid old password"
         )
 
-    user.password = hash_password(password_schema.new_password)
+    user.password = await hash_password(password_schema.new_password)
 
     db.add(user)
     await db.commit()
@@ -145,17 +179,45 @@ async def change_user_password_logic(
 
 
 async def delete_user_logic(
-    username: str, password: str, db: AsyncSession
+    user: UserModel, password: str, db: AsyncSession
 ) -> dict[str, str]:
-    user = await get_user(username=username, db=db)
-
-    if not verify_password(password, user.password):
+    if not await verify_password(password, user.password):
         raise HTTPException(status_code=400, detail="Invalid password")
 
-    if os.path.exists(user.profile_photo):
-        os.remove(user.profile_photo)
-
-    await db.execute(delete(UserModel).where(UserModel.username == username))
+    # posts.author_id has no ON DELETE CASCADE, the user's posts go first and
+    # so do their image references
+    posts_images = await db.execute(
+        delete(PostModel).where(PostModel.author_id == user.id).returning(PostModel.images)
+    )
+    await release_images(
+        [user.profile_photo, *(path for images in posts_images.scalars() for path in images or [])],
+        db,
+    )
+    await db.execute(delete(UserModel).where(UserModel.id == user.id))
     await db.commit()
 
     return {"message": "User has been deleted successfully"}
+
+
+async def process_profile_photo(user_id: int):
+    """Background task, renders the variants of a new profile photo."""
+    async with SessionLocal() as db:
+        user = await get_user(user_id=user_id, db=db)
+        photo = user.profile_photo if user else None
+    if not photo:
+        return
+
+    variants = await make_variants(photo)
+    if not variants:
+        return
+
+    async with SessionLocal() as db:
+        result = await db.execute(
+            select(UserModel).where(UserModel.id == user_id).with_for_update()
+        )
+        user = result.scalar()
+        # the photo may have been replaced again in the meantime
+        if not user or user.profile_photo != photo:
+            return
+        user.profile_photo_variants = variants
+        await db.commit()
@@ -0,0 +1,41 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import sync_version
+from core.logger import televito_logger
+from db.connection import SessionLocal
+from db.models import DataVersionModel
+
+
+async def bump_data_version(namespace: str, db: AsyncSession):
+    """Bumps namespace for every worker, committed with the caller's write."""
+    query = insert(DataVersionModel).values(namespace=namespace, version=1)
+    query = query.on_conflict_do_update(
+        index_elements=[DataVersionModel.namespace],
+        set_={"version": DataVersionModel.version + 1},
+    )
+    await db.execute(query)
+
+
+async def poll_data_versions(interval: float):
+    """Applies the versions other workers bumped to core.cache, until cancelled.
+
+    Caches keyed with get_version in this worker then drop entries another
+    worker's writes made stale within interval seconds.
+    """
+    initial = True
+    while True:
+        try:
+            async with SessionLocal() as db:
+                result = await db.execute(
+                    select(DataVersionModel.namespace, DataVersionModel.version)
+                )
+                for namespace, version in result.all():
+                    sync_version(namespace, version, initial=initial)
+            initial = False
+        except Exception as e:
+            televito_logger.warning(f"FAILED TO POLL DATA VERSIONS: {e!r}")
+        await asyncio.sleep(interval)
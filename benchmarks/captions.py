@@ -0,0 +1,94 @@
+"""Synthetic Russian rental captions in the format of the ingested channels."""
+import random
+from datetime import datetime, timedelta
+
+DISTRICTS = [
+    "Белград, Врачар",
+    "Белград, Нови Београд , блок 45",
+    "Белград, Звездара",
+    "Белград, Савски венац",
+    "Нови Сад, Грбавица",
+    "Нови Сад, Лиман 3",
+    "Белград, Дорчол",
+    "Панчево, центр",
+]
+MONTHS = [
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря",
+]
+ROOMS = [
+    "🛏 Студия",
+    "🛏 Студия (кухня-гостиная)",
+    "🛏 1 комната",
+    "🛏 1,5 комнаты (спальня + кухня)",
+    "🛏 2 комнаты (спальня + гостиная)",
+    "🛏 2.5 комнаты",
+    "🛏 3+ комнаты (две спальни и гостиная)",
+    "🛏 4 комнаты",
+]
+FLOORS = ["🏢 Этаж {floor}/{floors}", "🏢 Высокий цокольный этаж", "🏢 Подвал, этаж -1/{floors}"]
+PARKING = ["во дворе", "гараж за доплату", "на улице", "подземная, 50€"]
+NOISE = [
+    "",
+    "#аренда #белград",
+    "Писать @televito_rent",
+    "✅ Можно с детьми",
+    "Депозит равен месячной оплате",
+    "Коммунальные услуги оплачиваются отдельно",
+]
+
+
+def status_line(rng: random.Random, post_date: datetime) -> str:
+    day = (post_date + timedelta(days=rng.randint(0, 60))).day
+    month = rng.randint(1, 12)
+    return rng.choice(
+        [
+            "🗓 Актуальность - свободна сейчас",
+            f"🗓 Актуальность - свободна с {day} {rng.choice(MONTHS)}",
+            f"🗓 Актуальность - свободна с {day}.{month:02d}",
+            f"🗓 Актуальность - свободна с {day}.{month:02d}.{post_date.year + 1}г.",
+            f"🗓 Актуальность - свободна {day}",
+            "🗓 Актуальность - уточняйте",
+        ]
+    )
+
+
+def generate_caption(rng: random.Random, post_date: datetime) -> str:
+    floors = rng.randint(2, 20)
+    lines = [
+        f"📍 Локация - {rng.choice(DISTRICTS)}",
+        status_line(rng, post_date),
+        f"💸 {rng.randint(250, 3000)}€ {rng.choice(['', '+ депозит', 'в месяц'])}",
+        f"⏳ Срок аренды - от {rng.choice([1, 3, 6, 12])} месяцев",
+        rng.choice(ROOMS),
+        f"📐 Площадь {rng.randint(18, 160)} м²",
+        rng.choice(FLOORS).format(floor=rng.randint(1, floors), floors=floors),
+        f"🐶 С животными - {rng.choice(['можно', 'нельзя', 'по договоренности'])}",
+        f"🚗 Парковка - {rng.choice(PARKING)}",
+    ]
+    if rng.random() < 0.3:
+        lines.insert(2, "🏠 Новый дом")
+    if rng.random() < 0.5:
+        lines.insert(rng.randint(0, len(lines)), rng.choice(NOISE))
+    if rng.random() < 0.5:
+        lines.append(rng.choice(NOISE))
+    tail = lines[4:]
+    rng.shuffle(tail)
+    lines[4:] = tail
+    # a small share of malformed listings the parser must reject
+    if rng.random() < 0.03:
+        lines[0] = "📍 Локация: без дефиса"
+    if rng.random() < 0.03:
+        lines = [line for line in lines if not line.startswith("💸")] + ["💸 договорная"]
+    return "\n".join(lines)
+
+
+def generate_corpus(size: int, seed: int = 42) -> list[tuple[str, datetime]]:
+    """Deterministic list of (caption, post_date) pairs."""
+    rng = random.Random(seed)
+    start = datetime(2024, 6, 1, 12, 0)
+    corpus = []
+    for _ in range(size):
+        post_date = start + timedelta(minutes=rng.randint(0, 180 * 24 * 60))
+        corpus.append((generate_caption(rng, post_date), post_date))
+    return corpus
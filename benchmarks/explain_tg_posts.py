@@ -0,0 +1,144 @@
+"""Plan regression check for the tg_posts access paths.
+
+Seeds tg_posts up to --rows rows (1M by default) in the database from DB_URL,
+runs EXPLAIN on the queries tg_posts_list and the parser issue for common
+filter combinations and exits with status 1 if any of them falls back to a
+sequential scan on tg_posts. Point DB_URL at a scratch database.
+
+    DB_URL=postgresql+asyncpg://... python -m benchmarks.explain_tg_posts
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import APP_DIR  # noqa: F401  (puts app/ on sys.path)
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+
+from db.connection import engine, upgrade_schema
+from db.models import TGPostModel
+from services.tg_post_service import (
+    build_tg_posts_query,
+    get_sort_column,
+    keyset_order,
+    keyset_predicate,
+)
+
+SEED_SQL = """
+INSERT INTO tg_posts (
+    google_maps_url, location, status, price, duration, is_new, rooms,
+    area, floor, floors_in_building, pets_allowed, images, publication_datetime
+)
+SELECT
+    'https://maps.google.com/?q=' || g,
+    'локация ' || g,
+    current_date + (random() * 60)::int - 30,
+    300 + (random() * 2700)::int,
+    1 + (random() * 11)::int,
+    random() < 0.2,
+    1 + (random() * 8)::int / 2.0,
+    20 + (random() * 130)::int,
+    (random() * 20)::int,
+    20,
+    random() < 0.3,
+    ARRAY['file_' || g],
+    now() - random() * interval '180 days'
+FROM generate_series(:start, :stop) AS g
+"""
+
+LIMIT = 20
+
+
+def listing(sort_by=None, sort_order=None, seek=False, **filters):
+    """The page query tg_posts_list runs for these params."""
+    params = dict.fromkeys(
+        ("status", "price", "duration", "is_new", "rooms", "area", "floor", "pets_allowed")
+    )
+    params.update(filters)
+    query = build_tg_posts_query(**params)
+    sort_column = get_sort_column(sort_by)
+    if seek:
+        value = {"status": date.today(), "duration": 6, "rooms": 2.0}.get(
+            sort_by, datetime.now() - timedelta(days=30)
+        )
+        query = query.where(
+            keyset_predicate(sort_column, value, 500_000, bool(sort_order), after=True)
+        )
+    return query.order_by(*keyset_order(sort_column, bool(sort_order))).limit(LIMIT + 1)
+
+
+CASES = {
+    "default listing": listing(),
+    "deep keyset page": listing(seek=True),
+    "price range": listing(price="500-900"),
+    "price cap + rooms": listing(price="1200", rooms="2"),
+    "status today": listing(status="today"),
+    "area + floor": listing(area="60", floor="3-7"),
+    "new buildings": listing(is_new=True),
+    "pets allowed + price": listing(pets_allowed=True, price="600-1500"),
+    "sort by status": listing(sort_by="status", seek=True),
+    "sort by duration asc": listing(sort_by="duration", sort_order=True, seek=True),
+    "sort by rooms": listing(sort_by="rooms", rooms="1-3", seek=True),
+    "parser dedup key": select(TGPostModel.id).where(
+        TGPostModel.location == "локация 42",
+        TGPostModel.area == 60.0,
+        TGPostModel.floor == 3,
+        TGPostModel.floors_in_building == 20,
+    ),
+    "retention range": select(func.count()).where(
+        TGPostModel.publication_datetime < datetime.now() - timedelta(days=175)
+    ),
+}
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == "tg_posts":
+        found.append(plan.get("Filter", ""))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def seed(rows: int):
+    async with engine.begin() as conn:
+        existing = (await conn.execute(text("SELECT count(*) FROM tg_posts"))).scalar()
+        chunk = 100_000
+        for start in range(existing + 1, rows + 1, chunk):
+            stop = min(start + chunk - 1, rows)
+            await conn.execute(text(SEED_SQL), {"start": start, "stop": stop})
+            print(f"seeded {stop} rows")
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE tg_posts"))
+
+
+async def main(rows: int) -> int:
+    await asyncio.to_thread(upgrade_schema)
+    await seed(rows)
+
+    failures = 0
+    async with engine.connect() as conn:
+        for name, query in CASES.items():
+            sql = query.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+            result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scans = seq_scans(plan[0]["Plan"])
+            failures += bool(scans)
+            print(f"{'SEQ SCAN' if scans else 'ok':>8}  {name}  {'; '.join(scans)}")
+
+    await engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    sys.exit(asyncio.run(main(parser.parse_args().rows)))
@@ -0,0 +1,60 @@
+"""Per-request cost of the get_db dependency.
+
+Compares the old dependency, which ran Base.metadata.create_all before every
+session, with the current request-scoped one. Each "request" opens the
+dependency, runs one primary-key lookup and closes it.
+
+    DB_URL=postgresql+asyncpg://... python -m benchmarks.get_db_latency -n 2000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import print_summary, summarize
+
+from sqlalchemy import text
+
+from db import Base
+from db.connection import SessionLocal, engine, get_db
+from db.models import *
+
+
+async def legacy_get_db():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with SessionLocal() as db:
+        try:
+            yield db
+        finally:
+            await db.close()
+
+
+async def measure(dependency, requests: int) -> list[float]:
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        async for db in dependency():
+            await db.execute(text("SELECT id FROM tg_posts WHERE id = 1"))
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(requests: int):
+    # warm up the pool and the asyncpg statement cache
+    await measure(get_db, 20)
+    await measure(legacy_get_db, 20)
+
+    legacy = summarize(await measure(legacy_get_db, requests))
+    current = summarize(await measure(get_db, requests))
+    print_summary("create_all per request", legacy)
+    print_summary("session only          ", current)
+    print(f"speedup (mean): {legacy['mean_ms'] / current['mean_ms']:.1f}x")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    asyncio.run(main(parser.parse_args().requests))
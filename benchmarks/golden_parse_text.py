@@ -0,0 +1,94 @@
+"""Golden corpus check for parser_re.parse_text.
+
+The corpus in data/golden_captions.json holds synthetic and hand-written
+captions with the output of the reference implementation
+(legacy_parser_re). The check exits with status 1 if the current parse_text
+output differs for any of them.
+
+    python -m benchmarks.golden_parse_text            # check
+    python -m benchmarks.golden_parse_text --regenerate
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import date, datetime
+
+from benchmarks.common import APP_DIR  # noqa: F401  (puts app/ on sys.path)
+from benchmarks.captions import generate_corpus
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "data", "golden_captions.json")
+
+# edge cases the generator does not produce
+HAND_WRITTEN = [
+    "📍 Локация - Белград , Врачар\n💸 500€",
+    "Локация -Земун\n🗓 Актуальность - свободна 3\n💸 700",
+    "📍 Локация - Белград\n🗓 Актуальность - свободна с 31.12.2025г.\n💸 1.200€",
+    "📍 Локация - Белград\n🛏 2,5+ комнаты (с балконом)\n🏢 этаж 2/9\n💸 950",
+    "📍 Локация - Белград\n🏢 Высокий цокольный этаж/4\n💸 400",
+    "📍 Локация - Белград\n🛏 3 комнаты, этаж 5/6\n💸 1500",
+    "📍 Локация - Белград\n💸 договорная",
+    "📍 Локация - Белград\n🗓 Актуальность - свободна с 10 декабря\n💸 650",
+    "Сдаётся квартира без структуры",
+    "",
+]
+
+
+def encode(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def load_corpus() -> list[dict]:
+    with open(GOLDEN_PATH, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def regenerate(size: int):
+    from benchmarks.legacy_parser_re import parse_text
+
+    post_date = datetime(2024, 12, 20, 9, 30)
+    cases = generate_corpus(size) + [(text, post_date) for text in HAND_WRITTEN]
+    corpus = []
+    for text, post_date in cases:
+        result = parse_text(text, post_date)
+        corpus.append(
+            {
+                "caption": text,
+                "post_date": post_date.isoformat(),
+                "expected": {k: encode(v) for k, v in result.items()} if result else None,
+            }
+        )
+    with open(GOLDEN_PATH, "w", encoding="utf-8") as file:
+        # one case per line keeps diffs of the corpus readable
+        lines = ",\n".join(json.dumps(case, ensure_ascii=False) for case in corpus)
+        file.write(f"[\n{lines}\n]\n")
+    print(f"wrote {len(corpus)} cases to {GOLDEN_PATH}")
+
+
+def check() -> int:
+    from parser_re import parse_text
+
+    failures = 0
+    for case in load_corpus():
+        result = parse_text(case["caption"], datetime.fromisoformat(case["post_date"]))
+        actual = {k: encode(v) for k, v in result.items()} if result else None
+        if actual != case["expected"]:
+            failures += 1
+            print(f"MISMATCH for {case['caption']!r}\n  expected {case['expected']}\n  actual   {actual}")
+    print(f"{failures} mismatches")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    logging.getLogger("televito_bot").setLevel(logging.CRITICAL)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--size", type=int, default=250)
+    args = parser.parse_args()
+    if args.regenerate:
+        regenerate(args.size)
+    else:
+        sys.exit(check())
@@ -0,0 +1 @@
+"""HTTP load benchmarks, run with python -m benchmarks.http_load."""
@@ -0,0 +1,204 @@
+"""HTTP load test of the API routes.
+
+Seeds the database from DB_URL (see seed.py), then drives a weighted mix of
+workloads (workloads.MIXES) with --concurrency workers for --duration
+seconds. The app runs in-process through httpx's ASGI transport with its
+lifespan (data version poller, scheduler), or under uvicorn with --server
+uvicorn. Ingestion is disabled in both cases. Post creation uploads real
+JPEGs, so it includes rendering their variants in the background. Reports
+throughput and latency percentiles per endpoint, --output saves them as
+JSON and --compare prints the change against an earlier results file.
+Read endpoints are served from the response cache once warm, run with
+RESPONSE_CACHE_BACKEND=none to measure them without it.
+
+    DB_URL=postgresql+asyncpg://... python -m benchmarks.http_load \\
+        --mix mixed --duration 30 --concurrency 32 --output results.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+# set before the app config is imported, the background Telegram sync must not
+# compete with the measured requests
+os.environ["INGEST_ENABLED"] = "false"
+
+from benchmarks.common import APP_DIR, summarize
+
+import httpx
+
+from benchmarks.http_load.seed import BENCH_PASSWORD, seed
+from benchmarks.http_load.workloads import MIXES, WORKLOADS, Context, sample_jpegs
+
+
+async def wait_until_live(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/health/live")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("uvicorn did not come up")
+        await asyncio.sleep(0.2)
+
+
+def start_uvicorn(port: int, workers: int) -> subprocess.Popen:
+    env = {**os.environ, "INGEST_ENABLED": "false", "DB_AUTO_MIGRATE": "false"}
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--app-dir", APP_DIR,
+            "--port", str(port),
+            "--workers", str(workers),
+            "--log-level", "warning",
+        ],
+        env=env,
+    )
+
+
+async def prepare(client: httpx.AsyncClient, ctx: Context, sessions: int):
+    """Logs in a few users for post creation and loads the category ids."""
+    for index in range(1, min(sessions, ctx.users) + 1):
+        response = await client.post(
+            "/users/token",
+            data={"username": f"bench_user_{index}", "password": BENCH_PASSWORD},
+        )
+        if response.status_code == 200:
+            ctx.tokens.append(response.json()["access_token"])
+    response = await client.get("/categories/")
+    if response.status_code == 200:
+        ctx.category_ids = [category["id"] for category in response.json()]
+
+
+async def worker(client, ctx: Context, mix: dict[str, int], deadline: float, seed: int):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        workload = WORKLOADS[rng.choices(names, weights)[0]]
+        await workload(client, rng, ctx)
+
+
+def report(ctx: Context, elapsed: float, args) -> dict:
+    endpoints = {}
+    for endpoint, samples in sorted(ctx.samples.items()):
+        codes = ctx.statuses[endpoint]
+        errors = sum(n for code, n in codes.items() if not code.startswith(("2", "3")))
+        endpoints[endpoint] = {
+            **summarize(samples),
+            "rps": len(samples) / elapsed,
+            "errors": errors,
+            "status_codes": codes,
+        }
+    total = sum(len(samples) for samples in ctx.samples.values())
+    return {
+        "mix": args.mix,
+        "server": args.server,
+        "concurrency": args.concurrency,
+        "duration": elapsed,
+        "requests": total,
+        "rps": total / elapsed,
+        "endpoints": endpoints,
+    }
+
+
+def print_report(results: dict, baseline: dict | None):
+    print(
+        f"{results['requests']} requests in {results['duration']:.1f}s, "
+        f"{results['rps']:.1f} req/s ({results['mix']}, {results['server']}, "
+        f"concurrency {results['concurrency']})"
+    )
+    header = f"{'endpoint':<36} {'count':>7} {'rps':>8} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    print(header)
+    for endpoint, stats in results["endpoints"].items():
+        line = (
+            f"{endpoint:<36} {stats['count']:>7} {stats['rps']:>8.1f} "
+            f"{stats['p50_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['errors']:>7}"
+        )
+        before = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if before and before["p99_ms"] and before["rps"]:
+            line += (
+                f"   rps {stats['rps'] / before['rps'] - 1:+.0%}"
+                f", p99 {stats['p99_ms'] / before['p99_ms'] - 1:+.0%}"
+            )
+        print(line)
+
+
+async def main(args):
+    if not args.skip_seed:
+        from db.connection import engine, upgrade_schema
+
+        await asyncio.to_thread(upgrade_schema)
+        await seed(tg_posts=args.tg_posts, users=args.users, posts=args.posts)
+        await engine.dispose()
+
+    sample_jpegs()  # encoded before the clock starts
+
+    server = None
+    # ASGITransport sends no lifespan events, the app's startup is run here
+    lifespan = contextlib.nullcontext()
+    if args.server == "uvicorn":
+        server = start_uvicorn(args.port, args.workers)
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60)
+    else:
+        from main import app
+
+        lifespan = app.router.lifespan_context(app)
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60)
+
+    try:
+        async with lifespan, client:
+            if server:
+                await wait_until_live(client)
+            ctx = Context(args.users, args.tg_posts, samples={}, statuses={})
+            await prepare(client, ctx, sessions=20)
+            ctx.samples.clear()
+            ctx.statuses.clear()
+
+            started_at = time.perf_counter()
+            deadline = started_at + args.duration
+            await asyncio.gather(
+                *(
+                    worker(client, ctx, MIXES[args.mix], deadline, seed=index)
+                    for index in range(args.concurrency)
+                )
+            )
+            elapsed = time.perf_counter() - started_at
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    results = report(ctx, elapsed, args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--server", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--tg-posts", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="results JSON of an earlier run")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,112 @@
+"""Tops up the benchmark database to the requested volumes.
+
+Rows are only added, never removed, so seeding twice with the same volumes
+is a no-op. Seeded users all share BENCH_PASSWORD.
+"""
+from benchmarks.common import APP_DIR  # noqa: F401  (puts app/ on sys.path)
+from benchmarks.explain_tg_posts import seed as seed_tg_posts
+
+from sqlalchemy import text
+
+from core.security import hash_password
+from db.connection import SessionLocal, engine
+from services.version_service import bump_data_version
+
+BENCH_PASSWORD = "bench-password"
+
+CATEGORIES_SQL = """
+INSERT INTO categories (name, parent_id)
+SELECT 'bench category ' || g, NULL FROM generate_series(1, :count) AS g
+ON CONFLICT (name) DO NOTHING
+"""
+
+SUBCATEGORIES_SQL = """
+INSERT INTO categories (name, parent_id)
+SELECT parent.name || ' / ' || g, parent.id
+FROM categories AS parent, generate_series(1, :count) AS g
+WHERE parent.name LIKE 'bench category %'
+ON CONFLICT (name) DO NOTHING
+"""
+
+USERS_SQL = """
+INSERT INTO users (username, email, password)
+SELECT 'bench_user_' || g, 'bench_user_' || g || '@example.com', :password
+FROM generate_series(:start, :stop) AS g
+"""
+
+POSTS_SQL = """
+INSERT INTO posts (
+    location, title, price, description, is_new, images,
+    author_id, category_id, subcategory_id
+)
+SELECT
+    'Белград, блок ' || g,
+    'bench post ' || g,
+    (random() * 2000)::int,
+    'seeded by benchmarks.http_load',
+    random() < 0.5,
+    ARRAY[]::varchar[],
+    users.id,
+    sub.parent_id,
+    sub.id
+FROM generate_series(:start, :stop) AS g
+JOIN LATERAL (
+    SELECT id FROM users WHERE username LIKE 'bench_user_%'
+    ORDER BY id OFFSET g % :users LIMIT 1
+) AS users ON true
+JOIN LATERAL (
+    SELECT id, parent_id FROM categories WHERE parent_id IS NOT NULL
+    ORDER BY id OFFSET g % :subcategories LIMIT 1
+) AS sub ON true
+"""
+
+
+async def count(conn, sql: str) -> int:
+    return (await conn.execute(text(sql))).scalar()
+
+
+async def seed(
+    tg_posts: int,
+    users: int,
+    posts: int,
+    categories: int = 8,
+    subcategories: int = 4,
+):
+    """Seeds categories, users, their posts and tg_posts."""
+    await seed_tg_posts(tg_posts)
+
+    # categories are cached by every worker, the app must see the seeded ones
+    async with SessionLocal() as db:
+        await db.execute(text(CATEGORIES_SQL), {"count": categories})
+        await db.execute(text(SUBCATEGORIES_SQL), {"count": subcategories})
+        await bump_data_version("categories", db)
+        await db.commit()
+
+    async with engine.begin() as conn:
+        existing = await count(
+            conn, "SELECT count(*) FROM users WHERE username LIKE 'bench_user_%'"
+        )
+        if existing < users:
+            # one bcrypt hash for every user, hashing is what the login burst measures
+            await conn.execute(
+                text(USERS_SQL),
+                {
+                    "start": existing + 1,
+                    "stop": users,
+                    "password": await hash_password(BENCH_PASSWORD),
+                },
+            )
+            print(f"seeded {users} users")
+
+        existing = await count(conn, "SELECT count(*) FROM posts")
+        if existing < posts:
+            await conn.execute(
+                text(POSTS_SQL),
+                {
+                    "start": existing + 1,
+                    "stop": posts,
+                    "users": users,
+                    "subcategories": categories * subcategories,
+                },
+            )
+            print(f"seeded {posts} posts")
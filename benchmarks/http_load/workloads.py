@@ -0,0 +1,189 @@
+"""Request mixes driven by the load runner.
+
+A workload is an async function that issues one logical operation through the
+client and times every request it makes through ctx.request.
+"""
+import functools
+import io
+import random
+import time
+
+import httpx
+from PIL import Image
+
+from benchmarks.http_load.seed import BENCH_PASSWORD
+
+SORT_COLUMNS = ["status", "duration", "rooms", "area", "floor"]
+
+
+class Context:
+    """State shared by the workers of one run."""
+
+    def __init__(self, users: int, tg_posts: int, samples: dict, statuses: dict):
+        self.users = users
+        self.tg_posts = tg_posts
+        self.samples = samples  # endpoint -> [seconds]
+        self.statuses = statuses  # endpoint -> {status code: count}
+        self.tokens: list[str] = []
+        self.category_ids: list[int] = []
+
+    async def request(
+        self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs
+    ) -> httpx.Response | None:
+        started_at = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            code = response.status_code
+        except httpx.HTTPError as e:
+            response, code = None, type(e).__name__
+        self.samples.setdefault(endpoint, []).append(time.perf_counter() - started_at)
+        codes = self.statuses.setdefault(endpoint, {})
+        codes[str(code)] = codes.get(str(code), 0) + 1
+        return response
+
+
+@functools.cache
+def sample_jpegs() -> list[bytes]:
+    """A few noise photos of phone camera sizes, encoded once per run."""
+    rng = random.Random(0)
+    samples = []
+    for _ in range(6):
+        size = (rng.randint(800, 3000), rng.randint(600, 2000))
+        bands = [Image.effect_noise(size, rng.randint(20, 80)) for _ in range(3)]
+        buffer = io.BytesIO()
+        Image.merge("RGB", bands).save(buffer, "JPEG", quality=85)
+        samples.append(buffer.getvalue())
+    return samples
+
+
+def random_filters(rng: random.Random) -> dict:
+    """A few of the tg_posts_list filters with realistic values."""
+    candidates = {
+        "price": lambda: f"{rng.randint(200, 800)}-{rng.randint(900, 3000)}",
+        "rooms": lambda: f"{rng.randint(1, 2)}-{rng.randint(2, 4)}",
+        "area": lambda: f"{rng.randint(20, 60)}-{rng.randint(60, 150)}",
+        "duration": lambda: str(rng.choice([1, 3, 6, 12])),
+        "floor": lambda: f"{rng.randint(0, 3)}-{rng.randint(4, 20)}",
+        "is_new": lambda: rng.choice(["true", "false"]),
+        "pets_allowed": lambda: "true",
+        "status": lambda: "today",
+    }
+    names = rng.sample(sorted(candidates), rng.randint(1, 4))
+    params = {name: candidates[name]() for name in names}
+    if rng.random() < 0.4:
+        params["sort_by"] = rng.choice(SORT_COLUMNS)
+        params["sort_order"] = rng.choice(["true", "false"])
+    return params
+
+
+async def filter_listing(client, rng, ctx: Context):
+    params = random_filters(rng)
+    params["limit"] = 20
+    await ctx.request(client, "GET /tg_posts filtered", "GET", "/tg_posts/", params=params)
+
+
+async def deep_offset_pagination(client, rng, ctx: Context):
+    params = {"page_num": rng.randint(200, 2000), "limit": 20, "count": "capped"}
+    await ctx.request(client, "GET /tg_posts deep offset", "GET", "/tg_posts/", params=params)
+
+
+async def deep_cursor_pagination(client, rng, ctx: Context):
+    """Follows the next links for up to 20 pages."""
+    url, params = "/tg_posts/", {"pagination": "cursor", "limit": 20}
+    if rng.random() < 0.5:
+        params["sort_by"] = rng.choice(SORT_COLUMNS)
+    for _ in range(20):
+        response = await ctx.request(
+            client, "GET /tg_posts cursor page", "GET", url, params=params
+        )
+        if response is None or response.status_code != 200:
+            return
+        next_url = response.json()["pagination"]["next"]
+        if not next_url:
+            return
+        url, params = httpx.URL(next_url).raw_path.decode(), None
+
+
+async def tg_post_detail(client, rng, ctx: Context):
+    post_id = rng.randint(1, ctx.tg_posts)
+    await ctx.request(client, "GET /tg_posts/{id}", "GET", f"/tg_posts/{post_id}")
+
+
+async def login(client, rng, ctx: Context):
+    username = f"bench_user_{rng.randint(1, ctx.users)}"
+    await ctx.request(
+        client,
+        "POST /users/token",
+        "POST",
+        "/users/token",
+        data={"username": username, "password": BENCH_PASSWORD},
+    )
+
+
+async def categories(client, rng, ctx: Context):
+    await ctx.request(client, "GET /categories", "GET", "/categories/")
+    if ctx.category_ids:
+        parent_id = rng.choice(ctx.category_ids)
+        await ctx.request(
+            client,
+            "GET /categories/{id}/subcategories",
+            "GET",
+            f"/categories/{parent_id}/subcategories",
+        )
+
+
+async def create_post(client, rng, ctx: Context):
+    """Creates a post with 1-3 photos as one of the pre-logged-in users.
+
+    Random bytes after the JPEG end marker make every upload new content,
+    so the store keeps it and its variants are rendered, while decoders
+    ignore them.
+    """
+    if not ctx.tokens or not ctx.category_ids:
+        return
+    images = []
+    for index in range(rng.randint(1, 3)):
+        content = rng.choice(sample_jpegs()) + rng.randbytes(16)
+        images.append(("images", (f"bench{index}.jpg", io.BytesIO(content), "image/jpeg")))
+    await ctx.request(
+        client,
+        "POST /posts",
+        "POST",
+        "/posts/",
+        params={
+            "location": "Белград, Врачар",
+            "title": "bench post",
+            "price": rng.randint(100, 2000),
+            "category_id": rng.choice(ctx.category_ids),
+        },
+        files=images,
+        headers={"Authorization": f"Bearer {rng.choice(ctx.tokens)}"},
+    )
+
+
+WORKLOADS = {
+    "filter_listing": filter_listing,
+    "deep_offset": deep_offset_pagination,
+    "deep_cursor": deep_cursor_pagination,
+    "tg_post_detail": tg_post_detail,
+    "login": login,
+    "categories": categories,
+    "create_post": create_post,
+}
+
+# name -> {workload: weight}
+MIXES = {
+    "browse": {"filter_listing": 6, "deep_cursor": 1, "tg_post_detail": 3, "categories": 1},
+    "pagination": {"deep_offset": 1, "deep_cursor": 1},
+    "login_burst": {"login": 1},
+    "create_posts": {"create_post": 1},
+    "mixed": {
+        "filter_listing": 10,
+        "deep_offset": 1,
+        "deep_cursor": 1,
+        "tg_post_detail": 5,
+        "categories": 2,
+        "login": 1,
+        "create_post": 1,
+    },
+}
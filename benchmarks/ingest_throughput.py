@@ -0,0 +1,193 @@
+"""End-to-end ingest throughput of Parser.update_db on a synthetic history.
+
+Serves generated channel histories (captioned posts with their media group
+photos, a share of them reposts of earlier listings) through a stand-in for
+the pyrogram client and writes them to the database from DB_URL. Reports
+posts per second, the p50/p99 latency from a post being parsed to its batch
+being committed and the database round trips per post. Photo mirroring is
+off, the stand-in client has no media to download.
+
+tg_posts and ingest_state are emptied first, point DB_URL at a scratch
+database.
+
+    DB_URL=postgresql+asyncpg://... python -m benchmarks.ingest_throughput \\
+        --channels 4 --posts 5000 --repost-share 0.3
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from benchmarks.captions import generate_caption
+from benchmarks.common import print_summary
+
+from sqlalchemy import event, func, select, text
+
+from core import metrics
+from db.connection import ParserSessionLocal, parser_engine, upgrade_schema
+from db.models import TGPostModel
+from parser import Parser, rate_limiter
+
+
+def generate_history(channel: str, posts: int, repost_share: float, seed: int) -> list:
+    """Messages of one channel, newest first like get_chat_history returns them.
+
+    Every listing is a captioned message followed by 0-4 photos of its media
+    group, the last post is from a few minutes ago and they go back ~30 days.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    chat = SimpleNamespace(id=-1000 - seed, username=channel)
+    captions = []
+    messages = []
+    message_id = 0
+    for index in range(posts):
+        post_date = now - timedelta(minutes=(posts - index) * 30 * 24 * 60 / posts)
+        if captions and rng.random() < repost_share:
+            caption = rng.choice(captions)
+        else:
+            caption = generate_caption(rng, post_date)
+            captions.append(caption)
+
+        message_id += 1
+        group_id = str(message_id)
+        url = f"https://maps.google.com/?q={rng.random():.6f},{rng.random():.6f}"
+        messages.append(
+            SimpleNamespace(
+                id=message_id,
+                chat=chat,
+                date=post_date,
+                caption=caption,
+                caption_entities=[SimpleNamespace(url=url)],
+                photo=SimpleNamespace(file_id=f"{channel}-{message_id}"),
+                media_group_id=group_id,
+            )
+        )
+        for _ in range(rng.randint(0, 4)):
+            message_id += 1
+            messages.append(
+                SimpleNamespace(
+                    id=message_id,
+                    chat=chat,
+                    date=post_date,
+                    caption=None,
+                    caption_entities=None,
+                    photo=SimpleNamespace(file_id=f"{channel}-{message_id}"),
+                    media_group_id=group_id,
+                )
+            )
+    messages.reverse()
+    return messages
+
+
+class FakeClient:
+    """Serves get_chat_history pages from generated histories."""
+
+    def __init__(self, histories: dict[str, list], page_latency: float):
+        self.histories = histories
+        self.page_latency = page_latency
+        self.is_connected = True
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def get_chat_history(self, channel: str, limit: int, offset_id: int = 0):
+        await asyncio.sleep(self.page_latency)
+        history = self.histories[channel]
+        # ids run from len(history) down to 1
+        start = len(history) - offset_id + 1 if offset_id else 0
+        for message in history[start : start + limit]:
+            yield message
+
+
+async def reset_tables():
+    async with parser_engine.begin() as conn:
+        await conn.execute(text("TRUNCATE tg_posts, ingest_state RESTART IDENTITY"))
+
+
+async def main(args):
+    await asyncio.to_thread(upgrade_schema)
+    await reset_tables()
+
+    channels = [f"bench_channel_{index}" for index in range(args.channels)]
+    histories = {
+        channel: generate_history(channel, args.posts, args.repost_share, seed)
+        for seed, channel in enumerate(channels)
+    }
+    messages = sum(len(history) for history in histories.values())
+    client = FakeClient(histories, args.page_latency)
+    rate_limiter.min_interval = rate_limiter.interval = args.request_interval
+
+    # keep every latency sample instead of the default window
+    metrics.latencies["ingest.post_latency"] = metrics.LatencyStats(
+        window=args.channels * args.posts
+    )
+    round_trips = 0
+
+    def count_round_trip(*_):
+        nonlocal round_trips
+        round_trips += 1
+
+    event.listen(parser_engine.sync_engine, "before_cursor_execute", count_round_trip)
+
+    started_at = time.perf_counter()
+    async with ParserSessionLocal() as session:
+        totals = await Parser(
+            session, batch_size=args.batch_size, client=client, mirror=False
+        ).update_db(channels)
+    elapsed = time.perf_counter() - started_at
+    event.remove(parser_engine.sync_engine, "before_cursor_execute", count_round_trip)
+
+    async with ParserSessionLocal() as session:
+        stored = await session.scalar(select(func.count()).select_from(TGPostModel))
+    await parser_engine.dispose()
+
+    counters = metrics.snapshot("")["counters"]
+    parsed = sum(counters.get(f"ingest.{channel}.posts_parsed", 0) for channel in channels)
+    latency = metrics.latencies["ingest.post_latency"].snapshot()
+    results = {
+        "channels": args.channels,
+        "messages": messages,
+        "posts_parsed": parsed,
+        "posts_stored": stored,
+        "totals": totals,
+        "parse_cache_hits": counters.get("parse_cache.hits", 0),
+        "seconds": elapsed,
+        "posts_per_second": parsed / elapsed,
+        "round_trips": round_trips,
+        "round_trips_per_post": round_trips / parsed if parsed else 0.0,
+        "latency": latency,
+    }
+
+    print(
+        f"{parsed} posts ({messages} messages, {stored} rows stored) in {elapsed:.2f}s: "
+        f"{results['posts_per_second']:.0f} posts/s"
+    )
+    print(f"totals: {totals}, parse cache hits: {results['parse_cache_hits']:.0f}")
+    print(f"round trips: {round_trips} ({results['round_trips_per_post']:.3f} per post)")
+    print_summary("post latency", latency)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--channels", type=int, default=2)
+    parser.add_argument("--posts", type=int, default=2000, help="listings per channel")
+    parser.add_argument("--repost-share", type=float, default=0.3)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--page-latency", type=float, default=0.0, help="simulated seconds per history page"
+    )
+    parser.add_argument(
+        "--request-interval", type=float, default=0.0, help="rate limiter min interval"
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,70 @@
+"""Password verification throughput and event loop stalls during a login burst.
+
+Runs --logins concurrent bcrypt verifications, first inline in the coroutines
+like the old verify_password did, then through the password pool of
+core.security. A heartbeat task ticking every 10 ms measures how long the
+event loop was blocked meanwhile, which is the latency every other request on
+the worker would see. No database is needed; for the full login path see the
+login_burst mix of benchmarks.http_load.
+
+    python -m benchmarks.login_throughput --logins 64
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import print_summary, summarize
+
+from core import metrics
+from core.security import pwd_context, verify_password
+
+PASSWORD = "bench-password"
+TICK = 0.01
+
+
+async def heartbeat(lags: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started_at - TICK)
+
+
+async def inline_verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+async def burst(verify, hashed: str, logins: int) -> tuple[float, list[float], list[float]]:
+    lags, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(TICK * 2)
+    latencies = []
+
+    async def login():
+        started_at = time.perf_counter()
+        assert await verify(PASSWORD, hashed)
+        latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started_at
+    stop.set()
+    await ticker
+    return elapsed, latencies, lags
+
+
+async def main(logins: int):
+    hashed = pwd_context.hash(PASSWORD)
+    for name, verify in (("inline", inline_verify), ("thread pool", verify_password)):
+        elapsed, latencies, lags = await burst(verify, hashed, logins)
+        print(f"{name}: {logins / elapsed:.1f} logins/s")
+        print_summary("  login latency", summarize(latencies))
+        print_summary("  loop lag     ", summarize(lags))
+
+    queue_time = metrics.latencies["auth.password_queue_time"].snapshot()
+    print_summary("pool queue time", queue_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=64)
+    asyncio.run(main(parser.parse_args().logins))
@@ -0,0 +1,47 @@
+"""Throughput of parser_re.parse_text in listings per second.
+
+Runs the reference implementation (legacy_parser_re) and the current one
+over the same synthetic corpus, checks they agree and prints both rates.
+
+    python -m benchmarks.parse_text_throughput -n 20000
+"""
+import argparse
+import logging
+import time
+
+from benchmarks.common import APP_DIR  # noqa: F401  (puts app/ on sys.path)
+from benchmarks.captions import generate_corpus
+from benchmarks import legacy_parser_re
+import parser_re
+
+
+def run(parse_text, corpus, repeat: int) -> tuple[float, list]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [parse_text(text, post_date) for text, post_date in corpus]
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best, results
+
+
+def main(size: int, repeat: int):
+    # the error log of rejected listings would dominate the timings
+    logging.getLogger("televito_bot").setLevel(logging.CRITICAL)
+    corpus = generate_corpus(size)
+
+    legacy_rate, legacy_results = run(legacy_parser_re.parse_text, corpus, repeat)
+    current_rate, current_results = run(parser_re.parse_text, corpus, repeat)
+    mismatches = sum(a != b for a, b in zip(legacy_results, current_results))
+
+    print(f"listings:  {size}, best of {repeat}")
+    print(f"legacy:    {legacy_rate:,.0f} listings/s")
+    print(f"current:   {current_rate:,.0f} listings/s ({current_rate / legacy_rate:.2f}x)")
+    print(f"mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--size", type=int, default=20000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.size, args.repeat)
@@ -0,0 +1,81 @@
+"""Image upload write throughput and event loop stalls.
+
+Saves --images spooled uploads of --size-kb each to a temporary directory,
+first one after the other with the old blocking copyfileobj, then with the
+streaming stream_upload of core.utils, all images of a post concurrently. A
+heartbeat task measures how long the event loop was blocked meanwhile.
+
+    python -m benchmarks.upload_throughput --images 10 --size-kb 4096
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from uuid import uuid4
+
+from benchmarks.common import print_summary, summarize
+
+from fastapi import UploadFile
+
+from core.utils import stream_upload
+
+TICK = 0.005
+
+
+def make_uploads(count: int, size: int) -> list[UploadFile]:
+    uploads = []
+    for index in range(count):
+        spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        spooled.write(os.urandom(size))
+        spooled.seek(0)
+        uploads.append(UploadFile(spooled, size=size, filename=f"image{index}.jpg"))
+    return uploads
+
+
+async def legacy_save(images: list[UploadFile], dir: str):
+    for image in images:
+        with open(os.path.join(dir, f"{uuid4()}.jpg"), "wb") as buffer:
+            shutil.copyfileobj(image.file, buffer)
+
+
+async def concurrent_save(images: list[UploadFile], dir: str):
+    await asyncio.gather(
+        *(stream_upload(image, os.path.join(dir, f"{uuid4()}.jpg")) for image in images)
+    )
+
+
+async def heartbeat(lags: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started_at - TICK)
+
+
+async def main(images: int, size: int, rounds: int):
+    modes = (("blocking, serial", legacy_save), ("streaming, concurrent", concurrent_save))
+    for name, save in modes:
+        durations, lags, stop = [], [], asyncio.Event()
+        ticker = asyncio.create_task(heartbeat(lags, stop))
+        for _ in range(rounds):
+            uploads = make_uploads(images, size)
+            with tempfile.TemporaryDirectory() as dir:
+                started_at = time.perf_counter()
+                await save(uploads, dir)
+                durations.append(time.perf_counter() - started_at)
+        stop.set()
+        await ticker
+        megabytes = images * size / 2**20
+        print(f"{name}: {megabytes * rounds / sum(durations):.1f} MB/s")
+        print_summary("  post upload", summarize(durations))
+        print_summary("  loop lag   ", summarize(lags))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--size-kb", type=int, default=4096)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.images, args.size_kb * 1024, args.rounds))
@@ -0,0 +1,129 @@
+"""Credential lookup latency on a large users table.
+
+Seeds users up to --rows rows (1M by default) in the database from DB_URL,
+then times the lookups authenticate_user and get_current_user run: the old
+case-sensitive username/email/phone predicates next to the current get_user
+ones, and prints the plan node each of them uses. Seeded users have
+mixed-case usernames and emails and formatted phones. Point DB_URL at a
+scratch database.
+
+    DB_URL=postgresql+asyncpg://... python -m benchmarks.user_lookup -n 500
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.common import print_summary, summarize
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+
+from db.connection import SessionLocal, engine, upgrade_schema
+from db.models import UserModel
+from db.models.user_model import normalize_phone
+from services.user_service import get_user
+
+SEED_SQL = """
+INSERT INTO users (username, email, phone, phone_normalized, password)
+SELECT
+    'Lookup_User_' || g,
+    'Lookup.User.' || g || '@Example.com',
+    '+3816' || lpad(g::text, 8, '0'),
+    '3816' || lpad(g::text, 8, '0'),
+    'not-a-real-hash'
+FROM generate_series(:start, :stop) AS g
+"""
+
+
+async def seed(rows: int):
+    async with engine.begin() as conn:
+        existing = (
+            await conn.execute(
+                text("SELECT count(*) FROM users WHERE username LIKE 'Lookup_User_%'")
+            )
+        ).scalar()
+        chunk = 100_000
+        for start in range(existing + 1, rows + 1, chunk):
+            stop = min(start + chunk - 1, rows)
+            await conn.execute(text(SEED_SQL), {"start": start, "stop": stop})
+            print(f"seeded {stop} users")
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE users"))
+
+
+def legacy_query(kind: str, value: str):
+    """The predicates get_user used before the credential indexes."""
+    column = {"username": UserModel.username, "email": UserModel.email, "phone": UserModel.phone}
+    return select(UserModel).where(column[kind] == value)
+
+
+def current_query(kind: str, value: str):
+    """The predicate get_user uses now, for EXPLAIN."""
+    if kind == "phone":
+        return select(UserModel).where(UserModel.phone_normalized == normalize_phone(value))
+    column = {"username": UserModel.username, "email": UserModel.email}[kind]
+    return select(UserModel).where(func.lower(column) == value.lower())
+
+
+def credentials(kind: str, number: int) -> tuple[str, str]:
+    """(stored value, what a user would type) for seeded user number."""
+    if kind == "username":
+        return f"Lookup_User_{number}", f"lookup_user_{number}"
+    if kind == "email":
+        return f"Lookup.User.{number}@Example.com", f"lookup.user.{number}@example.com"
+    return f"+3816{number:08d}", f"3816{number:08d}"
+
+
+async def plan_node(query) -> str:
+    sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    async with engine.connect() as conn:
+        plan = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    node = plan[0]["Plan"]
+    while node.get("Plans") and node["Node Type"] in ("Gather", "Limit"):
+        node = node["Plans"][0]
+    return f"{node['Node Type']} {node.get('Index Name', '')}".strip()
+
+
+async def main(rows: int, lookups: int):
+    await asyncio.to_thread(upgrade_schema)
+    await seed(rows)
+    rng = random.Random(42)
+
+    for kind in ("username", "email", "phone"):
+        numbers = [rng.randint(1, rows) for _ in range(lookups)]
+        stored, typed = credentials(kind, numbers[0])
+        print(
+            f"{kind}: legacy plan {await plan_node(legacy_query(kind, stored))!r}, "
+            f"get_user plan {await plan_node(current_query(kind, typed))!r}"
+        )
+
+        legacy, current = [], []
+        async with SessionLocal() as db:
+            for number in numbers:
+                stored, typed = credentials(kind, number)
+                started_at = time.perf_counter()
+                await db.execute(legacy_query(kind, stored))
+                legacy.append(time.perf_counter() - started_at)
+
+                started_at = time.perf_counter()
+                user = await get_user(db=db, **{kind: typed})
+                current.append(time.perf_counter() - started_at)
+                assert user is not None, typed
+                db.expunge_all()
+        print_summary(f"  legacy  {kind:<8}", summarize(legacy))
+        print_summary(f"  get_user {kind:<7}", summarize(current))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("-n", "--lookups", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.lookups))